@@ -0,0 +1,256 @@
+import asyncio
+from copy import deepcopy
+from logging import getLogger
+from typing import Dict, List, Mapping, Optional, Sequence, Set, Tuple
+
+from cachetools import TTLCache
+
+from .dialog_storage import (
+    DialogStorage, PurgeCallback, Record, StorageKey, UserKey,
+    context_key, stack_key, top_intent_id, record_version, version_conflict,
+)
+from ..exceptions import VersionConflictError
+
+logger = getLogger(__name__)
+
+MISSING = object()
+# max delay before writing again changes which were not written
+MAX_RETRY_DELAY = 60
+
+
+class CachedDialogStorage(DialogStorage):
+    """
+    In-process cache in front of another dialog storage.
+
+    Loaded and saved records are kept for `ttl` seconds, up to `maxsize`
+    records. Saving is delayed for `write_delay` seconds, so multiple
+    changes of the same user are written once. With zero delay records
+    are written immediately.
+
+    Consistency: cache expects to be the only writer of the underlying
+    storage, e.g. a single polling worker. All changes made by it are
+    visible to next updates even before they are written.
+    Changes not written yet are lost if the process is killed,
+    so call `close` or `flush` on shutdown.
+    Versions are checked against cached records and then by underlying
+    storage when delayed changes are written. Changes rejected there
+    are dropped together with cached records.
+    If writing fails for other reasons, it is retried with growing delay.
+    Cached records are not loaded from underlying storage, so its `ttl`
+    should be longer than the cache one to keep stacks in use.
+    """
+
+    def __init__(self, storage: DialogStorage, maxsize: int = 10240,
+                 ttl: float = 600, write_delay: float = 0):
+        self.storage = storage
+        self.write_delay = write_delay
+        self.cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.pending: Dict[UserKey, Dict[StorageKey, Optional[Record]]] = {}
+        # versions expected by underlying storage for pending records
+        self.pending_versions: Dict[UserKey, Dict[StorageKey, int]] = {}
+        self._flush_handles: Dict[UserKey, asyncio.TimerHandle] = {}
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+    async def load(
+            self, chat_id: int, user_id: int, keys: Sequence[StorageKey],
+    ) -> List[Optional[Record]]:
+        result = [self._get(chat_id, user_id, key) for key in keys]
+        missing = [
+            key for key, data in zip(keys, result) if data is MISSING
+        ]
+        if missing:
+            loaded = dict(zip(
+                missing,
+                await self.storage.load(chat_id, user_id, missing),
+            ))
+            for key, data in loaded.items():
+                self._put(chat_id, user_id, key, data)
+            result = [
+                loaded[key] if data is MISSING else data
+                for key, data in zip(keys, result)
+            ]
+        return [deepcopy(data) for data in result]
+
+    async def load_stack_and_context(
+            self, chat_id: int, user_id: int, stack_id: str,
+    ) -> Tuple[Optional[Record], Optional[Record]]:
+        stack = self._get(chat_id, user_id, stack_key(stack_id))
+        if stack is MISSING:
+            stack, context = await self.storage.load_stack_and_context(
+                chat_id, user_id, stack_id,
+            )
+            self._put(chat_id, user_id, stack_key(stack_id), stack)
+            intent_id = top_intent_id(stack)
+            if intent_id is not None:
+                self._put(chat_id, user_id, context_key(intent_id), context)
+            return deepcopy(stack), deepcopy(context)
+
+        intent_id = top_intent_id(stack)
+        if intent_id is None:
+            return deepcopy(stack), None
+        context, = await self.load(
+            chat_id, user_id, [context_key(intent_id)],
+        )
+        return deepcopy(stack), context
+
+    async def save(
+            self, chat_id: int, user_id: int,
+            records: Sequence[Tuple[StorageKey, Optional[Record]]],
+            versions: Optional[Mapping[StorageKey, int]] = None,
+    ) -> None:
+        if not records:
+            return
+        if versions is not None:
+            for key, version in versions.items():
+                data = self._get(chat_id, user_id, key)
+                if data is not MISSING and record_version(data) != version:
+                    raise version_conflict(key)
+            self._remember_stored_versions(chat_id, user_id, records, versions)
+        pending = self.pending.setdefault((chat_id, user_id), {})
+        for key, data in records:
+            data = deepcopy(data)
+            self._put(chat_id, user_id, key, data)
+            pending[key] = data
+
+        if not self.write_delay:
+            await self._flush_user((chat_id, user_id))
+        elif (chat_id, user_id) not in self._flush_handles:
+            self._flush_handles[chat_id, user_id] = (
+                asyncio.get_running_loop().call_later(
+                    self.write_delay, self._start_flush, (chat_id, user_id),
+                )
+            )
+
+    def _remember_stored_versions(
+            self, chat_id: int, user_id: int,
+            records: Sequence[Tuple[StorageKey, Optional[Record]]],
+            versions: Mapping[StorageKey, int],
+    ) -> None:
+        """
+        Keep versions expected by underlying storage for records
+        which become pending, as they can differ from cached ones
+        """
+        user_key = (chat_id, user_id)
+        pending = self.pending.get(user_key, {})
+        pending_versions = self.pending_versions.setdefault(user_key, {})
+        for key, _ in records:
+            if key in pending:  # stored version is already known
+                continue
+            data = self._get(chat_id, user_id, key)
+            if data is MISSING:
+                # not cached, so proxy got it from storage or created it
+                pending_versions[key] = versions.get(key, 0)
+            else:
+                pending_versions[key] = record_version(data)
+
+    async def flush(self) -> None:
+        """
+        Write all pending changes to underlying storage.
+
+        Each user is written even if others fail,
+        then the first error is raised.
+        """
+        for handle in self._flush_handles.values():
+            handle.cancel()
+        self._flush_handles.clear()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        errors = []
+        for user_key in list(self.pending):
+            try:
+                await self._flush_user(user_key)
+            except Exception as e:
+                logger.error(
+                    "Cannot write dialog records of %s", user_key,
+                    exc_info=e,
+                )
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    async def close(self) -> None:
+        try:
+            await self.flush()
+        finally:
+            await self.storage.close()
+
+    async def purge_expired(
+            self, batch_size: int, on_purged: Optional[PurgeCallback] = None,
+    ) -> int:
+        self.cache.expire()
+
+        def drop_purged(user_key: UserKey, keys: Sequence[StorageKey]):
+            # otherwise purged records would be still loaded from cache
+            for key in keys:
+                self.cache.pop((*user_key, key), None)
+            if on_purged:
+                on_purged(user_key, keys)
+
+        return await self.storage.purge_expired(batch_size, drop_purged)
+
+    def _start_flush(self, user_key: UserKey, attempt: int = 0) -> None:
+        self._flush_handles.pop(user_key, None)
+        task = asyncio.create_task(self._flush_later(user_key, attempt))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    async def _flush_later(self, user_key: UserKey, attempt: int) -> None:
+        try:
+            await self._flush_user(user_key)
+        except VersionConflictError:
+            raise
+        except Exception:
+            retry = (
+                user_key in self.pending and
+                user_key not in self._flush_handles
+            )
+            if retry:
+                delay = min(self.write_delay * 2 ** (attempt + 1),
+                            MAX_RETRY_DELAY)
+                logger.warning(
+                    "Retry writing dialog records of %s in %s seconds",
+                    user_key, delay,
+                )
+                self._flush_handles[user_key] = (
+                    asyncio.get_running_loop().call_later(
+                        delay, self._start_flush, user_key, attempt + 1,
+                    )
+                )
+            raise
+
+    def _flush_done(self, task: asyncio.Task) -> None:
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(
+                "Cannot write dialog records", exc_info=task.exception(),
+            )
+
+    async def _flush_user(self, user_key: UserKey) -> None:
+        pending = self.pending.pop(user_key, None)
+        versions = self.pending_versions.pop(user_key, None)
+        if not pending:
+            return
+        try:
+            await self.storage.save(*user_key, list(pending.items()), versions)
+        except VersionConflictError:
+            for key in pending:
+                self.cache.pop((*user_key, key), None)
+            raise
+        except Exception:
+            # keep changes to retry on next flush unless they are replaced
+            self.pending.setdefault(user_key, {})
+            for key, data in pending.items():
+                self.pending[user_key].setdefault(key, data)
+            if versions:
+                self.pending_versions.setdefault(user_key, {}).update(versions)
+            raise
+
+    def _get(self, chat_id: int, user_id: int, key: StorageKey):
+        pending = self.pending.get((chat_id, user_id))
+        if pending and key in pending:
+            return pending[key]
+        return self.cache.get((chat_id, user_id, key), MISSING)
+
+    def _put(self, chat_id: int, user_id: int, key: StorageKey,
+             data: Optional[Record]) -> None:
+        self.cache[chat_id, user_id, key] = data
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from logging import getLogger
+from typing import Awaitable, Callable, Dict, Set, Tuple
+
+from cachetools import TTLCache
+
+logger = getLogger(__name__)
+
+MessageKey = Tuple[int, int]  # chat id, message id
+EditRequest = Callable[[], Awaitable]
+
+
+class EditCoalescer:
+    """
+    Limits edits of the same message to one per `window` seconds.
+
+    Edit is sent immediately if the message was not edited recently.
+    Otherwise, it is postponed till the end of the window and replaced
+    by newer edits, so only the latest one is sent.
+    """
+
+    def __init__(self, window: float = 1, maxsize: int = 100000):
+        self.window = window
+        self.last_edits: TTLCache = TTLCache(maxsize=maxsize, ttl=window)
+        self.pending: Dict[MessageKey, EditRequest] = {}
+        self._handles: Dict[MessageKey, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    def postpone(self, key: MessageKey, request: EditRequest) -> bool:
+        """
+        Keep edit request if message was edited recently.
+
+        Returns False if the edit must be sent now, it is counted as sent.
+        """
+        if key in self._handles:
+            self.pending[key] = request
+            return True
+        now = time.monotonic()
+        last_edit = self.last_edits.get(key)
+        if last_edit is None:
+            self.last_edits[key] = now
+            return False
+        self.pending[key] = request
+        self._handles[key] = asyncio.get_running_loop().call_later(
+            last_edit + self.window - now, self._send_pending, key,
+        )
+        return True
+
+    def cancel(self, key: MessageKey) -> None:
+        """
+        Drop postponed edit, e.g. when message is changed another way
+        """
+        handle = self._handles.pop(key, None)
+        if handle:
+            handle.cancel()
+        self.pending.pop(key, None)
+
+    async def flush(self) -> None:
+        """
+        Send all postponed edits now
+        """
+        for key in list(self._handles):
+            self._handles.pop(key).cancel()
+            self._send_pending(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _send_pending(self, key: MessageKey) -> None:
+        self._handles.pop(key, None)
+        request = self.pending.pop(key, None)
+        if request is None:
+            return
+        self.last_edits[key] = time.monotonic()
+        task = asyncio.create_task(request())
+        self._tasks.add(task)
+        task.add_done_callback(self._edit_done)
+
+    def _edit_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Cannot edit message", exc_info=task.exception())
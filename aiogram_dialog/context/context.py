@@ -17,6 +17,7 @@ class Context:
     start_data: Data = field(compare=False)
     dialog_data: DataDict = field(compare=False, default_factory=dict)
     widget_data: DataDict = field(compare=False, default_factory=dict)
+    _version: int = field(compare=False, default=0)
 
     @property
     def id(self):
@@ -0,0 +1,687 @@
+import time
+from collections import OrderedDict
+from copy import deepcopy
+from enum import Enum
+from typing import (
+    Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Protocol,
+    Sequence, Tuple,
+)
+
+from aiogram.contrib.fsm_storage.redis import RedisStorage2, STATE_DATA_KEY
+from aiogram.dispatcher.storage import BaseStorage
+from aiogram.utils import json as aiogram_json
+
+from .serializers import Record, Serializer, CompactSerializer
+from ..exceptions import VersionConflictError
+
+
+class RecordType(Enum):
+    CONTEXT = "c"
+    STACK = "s"
+
+
+class StorageKey(NamedTuple):
+    type: RecordType
+    id: str
+
+
+UserKey = Tuple[int, int]  # chat_id, user_id
+# called with keys of records removed by `purge_expired`
+PurgeCallback = Callable[[UserKey, Sequence[StorageKey]], None]
+
+
+def context_key(intent_id: str) -> StorageKey:
+    return StorageKey(RecordType.CONTEXT, intent_id)
+
+
+def stack_key(stack_id: str) -> StorageKey:
+    return StorageKey(RecordType.STACK, stack_id)
+
+
+class DialogStorage(Protocol):
+    """
+    Storage for dialog stacks and contexts.
+
+    Records are plain dicts prepared by `StorageProxy`,
+    `None` record means that it is absent or should be removed.
+
+    If `versions` are passed to `save`, records are saved only if
+    stored versions of those keys are the same, otherwise nothing is saved
+    and `VersionConflictError` is raised. Absent record has version 0.
+    """
+
+    async def load(
+            self, chat_id: int, user_id: int, keys: Sequence[StorageKey],
+    ) -> List[Optional[Record]]:
+        raise NotImplementedError
+
+    async def load_stack_and_context(
+            self, chat_id: int, user_id: int, stack_id: str,
+    ) -> Tuple[Optional[Record], Optional[Record]]:
+        """
+        Load stack record and record of its top context
+        """
+        raise NotImplementedError
+
+    async def save(
+            self, chat_id: int, user_id: int,
+            records: Sequence[Tuple[StorageKey, Optional[Record]]],
+            versions: Optional[Mapping[StorageKey, int]] = None,
+    ) -> None:
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """
+        Write pending changes and release resources owned by storage
+        """
+
+    async def purge_expired(
+            self, batch_size: int, on_purged: Optional[PurgeCallback] = None,
+    ) -> int:
+        """
+        Remove a batch of expired records.
+
+        Returns the number of removed records, if it is less than
+        `batch_size` there are no more expired records.
+        Keys of removed records are passed to `on_purged`.
+        Storages which expire records by themselves (e.g. in redis) return 0.
+        """
+        return 0
+
+
+def top_intent_id(stack: Optional[Record]) -> Optional[str]:
+    if not stack or not stack.get("intents"):
+        return None
+    return stack["intents"][-1]
+
+
+def record_version(record: Optional[Record]) -> int:
+    if not record:
+        return 0
+    return record.get("_version", 0)
+
+
+def version_conflict(key) -> VersionConflictError:
+    return VersionConflictError(f"Record `{key}` was changed concurrently")
+
+
+# Loads stack and its top context in one call.
+# Context key is built from ARGV as it depends on stack contents,
+# so the script is not compatible with Redis Cluster
+FSM_LOAD_STACK_SCRIPT = """
+local stack = redis.call('GET', KEYS[1])
+if not stack then
+    return {false, false}
+end
+local intents = cjson.decode(stack)['intents']
+if not intents or #intents == 0 then
+    return {stack, false}
+end
+return {stack, redis.call('GET', ARGV[1] .. intents[#intents] .. ARGV[2])}
+"""
+
+# Checks versions of records stored as JSON and saves them if all match.
+# ARGV: ttl, then expected version (empty if not checked)
+# and value (empty to delete) for each key
+FSM_SAVE_SCRIPT = """
+for i, key in ipairs(KEYS) do
+    local expected = tonumber(ARGV[i * 2])
+    if expected then
+        local raw = redis.call('GET', key)
+        local version = 0
+        if raw then
+            version = cjson.decode(raw)['_version'] or 0
+        end
+        if version ~= expected then
+            return key
+        end
+    end
+end
+local ttl = tonumber(ARGV[1])
+for i, key in ipairs(KEYS) do
+    local value = ARGV[i * 2 + 1]
+    if value == '' then
+        redis.call('DEL', key)
+    elseif ttl > 0 then
+        redis.call('SET', key, value, 'EX', ttl)
+    else
+        redis.call('SET', key, value)
+    end
+end
+return false
+"""
+
+
+class StackExpiry:
+    """
+    Tracks when each dialog stack was used last time.
+
+    Stack is expired `ttl` seconds after it was touched, together with
+    all records of its contexts. Records are bound to stacks by `touch`,
+    so only records touched in this process are tracked.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        # touched stacks are moved to the end, so it is ordered by expiration
+        self.stacks: Dict[Tuple[int, int, str], float] = OrderedDict()
+        self.stack_ids: Dict[UserKey, Dict[StorageKey, str]] = {}
+
+    def touch(
+            self, chat_id: int, user_id: int,
+            records: Iterable[Tuple[StorageKey, Optional[Record]]],
+    ) -> None:
+        """
+        Postpone expiration of stacks which own loaded or saved records.
+
+        Removed records are not tracked anymore
+        """
+        stack_ids = self.stack_ids.setdefault((chat_id, user_id), {})
+        expires_at = time.monotonic() + self.ttl
+        for key, data in records:
+            if data is None:
+                stack_ids.pop(key, None)
+                continue
+            if key.type is RecordType.STACK:
+                stack_id = key.id
+            else:
+                stack_id = data.get("_stack_id")
+            if stack_id is None:
+                continue
+            stack_ids[key] = stack_id
+            self.stacks[chat_id, user_id, stack_id] = expires_at
+            self.stacks.move_to_end((chat_id, user_id, stack_id))
+        if not stack_ids:
+            del self.stack_ids[chat_id, user_id]
+
+    def pop_expired(self) -> Optional[Tuple[UserKey, List[StorageKey]]]:
+        """
+        Forget the first expired stack, returns keys of its records
+        """
+        now = time.monotonic()
+        while self.stacks:
+            (chat_id, user_id, stack_id), expires_at = next(
+                iter(self.stacks.items()),
+            )
+            if expires_at > now:
+                return None
+            keys = self._pop_stack(chat_id, user_id, stack_id)
+            if keys:
+                return (chat_id, user_id), keys
+        return None
+
+    def pop_expired_of(
+            self, chat_id: int, user_id: int, keys: Sequence[StorageKey],
+    ) -> List[StorageKey]:
+        """
+        Forget expired stacks owning any of `keys`, returns their records
+        """
+        stack_ids = self.stack_ids.get((chat_id, user_id), {})
+        now = time.monotonic()
+        expired = []
+        owners = {
+            key.id if key.type is RecordType.STACK else stack_ids.get(key)
+            for key in keys
+        }
+        for stack_id in owners:
+            expires_at = self.stacks.get((chat_id, user_id, stack_id))
+            if expires_at is not None and expires_at <= now:
+                expired.extend(self._pop_stack(chat_id, user_id, stack_id))
+        return expired
+
+    def _pop_stack(
+            self, chat_id: int, user_id: int, stack_id: str,
+    ) -> List[StorageKey]:
+        del self.stacks[chat_id, user_id, stack_id]
+        stack_ids = self.stack_ids.get((chat_id, user_id), {})
+        keys = [key for key, id_ in stack_ids.items() if id_ == stack_id]
+        for key in keys:
+            del stack_ids[key]
+        if not stack_ids:
+            self.stack_ids.pop((chat_id, user_id), None)
+        return keys
+
+
+def _uses_redis_py(storage: BaseStorage) -> bool:
+    """
+    `RedisStorage2` of aiogram before 2.22 uses lazily created
+    aioredis connection with another API, it is not batched
+    """
+    if not isinstance(storage, RedisStorage2):
+        return False
+    try:
+        from redis.asyncio import Redis
+    except ImportError:
+        return False
+    return isinstance(getattr(storage, "_redis", None), Redis)
+
+
+class FSMDialogStorage(DialogStorage):
+    """
+    Keeps dialogs in aiogram FSM storage data using fake user ids.
+
+    For `RedisStorage2` working via redis-py (aiogram 2.22+) requests
+    are batched unless `batch=False`,
+    other storages are accessed one key at a time.
+    Versions are checked atomically only with batching enabled.
+    Batched requests access several keys of a user which are not
+    in the same hash slot, so Redis Cluster requires `batch=False`.
+
+    If `ttl` is set, a stack and its contexts are removed `ttl` seconds
+    after the stack was loaded or saved last time, on access
+    or by `purge_expired`. It is tracked in process memory, so records
+    left before restart are not removed: it suits in-memory storages,
+    while `RedisStorage2` can expire records itself with `data_ttl`.
+    """
+
+    def __init__(self, storage: BaseStorage, batch: bool = True,
+                 ttl: Optional[float] = None):
+        self.storage = storage
+        self.batch = batch and _uses_redis_py(storage)
+        self.expiry = StackExpiry(ttl) if ttl else None
+
+    async def load(
+            self, chat_id: int, user_id: int, keys: Sequence[StorageKey],
+    ) -> List[Optional[Record]]:
+        await self._remove_expired(chat_id, user_id, keys)
+        result = await self._load(chat_id, user_id, keys)
+        if self.expiry:
+            self.expiry.touch(chat_id, user_id, zip(keys, result))
+        return result
+
+    async def _load(
+            self, chat_id: int, user_id: int, keys: Sequence[StorageKey],
+    ) -> List[Optional[Record]]:
+        if not self.batch:
+            return [
+                await self.storage.get_data(
+                    chat=chat_id, user=self._fsm_user(user_id, key),
+                ) or None
+                for key in keys
+            ]
+        redis = self.storage._redis  # noqa
+        raw_values = await redis.mget([
+            self._redis_key(chat_id, user_id, key) for key in keys
+        ])
+        return [
+            aiogram_json.loads(raw) if raw else None for raw in raw_values
+        ]
+
+    async def load_stack_and_context(
+            self, chat_id: int, user_id: int, stack_id: str,
+    ) -> Tuple[Optional[Record], Optional[Record]]:
+        if not self.batch:
+            stack, = await self.load(chat_id, user_id, [stack_key(stack_id)])
+            intent_id = top_intent_id(stack)
+            if intent_id is None:
+                return stack, None
+            context, = await self.load(
+                chat_id, user_id, [context_key(intent_id)],
+            )
+            return stack, context
+
+        await self._remove_expired(chat_id, user_id, [stack_key(stack_id)])
+        redis = self.storage._redis  # noqa
+        context_prefix, _, context_suffix = self._redis_key(
+            chat_id, user_id, context_key("{}"),
+        ).partition("{}")
+        stack_raw, context_raw = await redis.eval(
+            FSM_LOAD_STACK_SCRIPT, 1,
+            self._redis_key(chat_id, user_id, stack_key(stack_id)),
+            context_prefix,
+            context_suffix,
+        )
+        stack = aiogram_json.loads(stack_raw) if stack_raw else None
+        context = aiogram_json.loads(context_raw) if context_raw else None
+        if self.expiry:
+            records = [(stack_key(stack_id), stack)]
+            intent_id = top_intent_id(stack)
+            if intent_id is not None:
+                records.append((context_key(intent_id), context))
+            self.expiry.touch(chat_id, user_id, records)
+        return stack, context
+
+    async def save(
+            self, chat_id: int, user_id: int,
+            records: Sequence[Tuple[StorageKey, Optional[Record]]],
+            versions: Optional[Mapping[StorageKey, int]] = None,
+    ) -> None:
+        if not records:
+            return
+        await self._remove_expired(chat_id, user_id, [k for k, _ in records])
+        await self._save(chat_id, user_id, records, versions)
+        if self.expiry:
+            self.expiry.touch(chat_id, user_id, records)
+
+    async def purge_expired(
+            self, batch_size: int, on_purged: Optional[PurgeCallback] = None,
+    ) -> int:
+        removed = 0
+        while self.expiry and removed < batch_size:
+            expired = self.expiry.pop_expired()
+            if expired is None:
+                break
+            user_key, keys = expired
+            await self._save(*user_key, [(key, None) for key in keys])
+            removed += len(keys)
+            if on_purged:
+                on_purged(user_key, keys)
+        return removed
+
+    async def _remove_expired(
+            self, chat_id: int, user_id: int, keys: Sequence[StorageKey],
+    ) -> None:
+        if not self.expiry:
+            return
+        expired = self.expiry.pop_expired_of(chat_id, user_id, keys)
+        if expired:
+            await self._save(chat_id, user_id, [(k, None) for k in expired])
+
+    async def _save(
+            self, chat_id: int, user_id: int,
+            records: Sequence[Tuple[StorageKey, Optional[Record]]],
+            versions: Optional[Mapping[StorageKey, int]] = None,
+    ) -> None:
+        if not self.batch:
+            if versions:
+                stored = await self.load(chat_id, user_id, list(versions))
+                for (key, version), data in zip(versions.items(), stored):
+                    if record_version(data) != version:
+                        raise version_conflict(key)
+            for key, data in records:
+                user = self._fsm_user(user_id, key)
+                if data is None:
+                    await self.storage.reset_data(chat=chat_id, user=user)
+                else:
+                    await self.storage.set_data(
+                        chat=chat_id, user=user, data=data,
+                    )
+            return
+
+        redis = self.storage._redis  # noqa
+        ttl = self.storage._data_ttl  # noqa
+        if versions:
+            await self._save_checked(chat_id, user_id, records, versions, ttl)
+            return
+        async with redis.pipeline(transaction=False) as pipe:
+            for key, data in records:
+                redis_key = self._redis_key(chat_id, user_id, key)
+                if data:
+                    pipe.set(redis_key, aiogram_json.dumps(data), ex=ttl)
+                else:
+                    pipe.delete(redis_key)
+            await pipe.execute()
+
+    async def _save_checked(
+            self, chat_id: int, user_id: int,
+            records: Sequence[Tuple[StorageKey, Optional[Record]]],
+            versions: Mapping[StorageKey, int], ttl: Optional[int],
+    ) -> None:
+        keys = []
+        args = [ttl or 0]
+        for key, data in records:
+            keys.append(self._redis_key(chat_id, user_id, key))
+            args.append(versions.get(key, ""))
+            args.append(aiogram_json.dumps(data) if data else "")
+        conflict = await self.storage._redis.eval(  # noqa
+            FSM_SAVE_SCRIPT, len(keys), *keys, *args,
+        )
+        if conflict:
+            raise version_conflict(conflict)
+
+    def _fsm_user(self, user_id: int, key: StorageKey) -> str:
+        if key.type is RecordType.CONTEXT:
+            return f"{user_id}:aiogd:context:{key.id}"
+        return f"{user_id}:aiogd:stack:{key.id}"
+
+    def _redis_key(self, chat_id: int, user_id: int, key: StorageKey) -> str:
+        return self.storage.generate_key(
+            chat_id, self._fsm_user(user_id, key), STATE_DATA_KEY,
+        )
+
+
+class MemoryDialogStorage(DialogStorage):
+    """
+    Keeps dialogs in process memory.
+
+    If `ttl` is set, a stack and its contexts are dropped `ttl` seconds
+    after the stack was loaded or saved last time. Expired records are
+    removed on access or by `purge_expired`.
+    All operations complete without switching to other tasks,
+    so the result of concurrent updates depends only on the order of calls.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self.users: Dict[UserKey, Dict[StorageKey, Record]] = {}
+        self.expiry = StackExpiry(ttl) if ttl else None
+
+    async def load(
+            self, chat_id: int, user_id: int, keys: Sequence[StorageKey],
+    ) -> List[Optional[Record]]:
+        records = self._records(chat_id, user_id, keys)
+        result = [records.get(key) for key in keys]
+        self._touch(chat_id, user_id, zip(keys, result))
+        return deepcopy(result)
+
+    async def load_stack_and_context(
+            self, chat_id: int, user_id: int, stack_id: str,
+    ) -> Tuple[Optional[Record], Optional[Record]]:
+        records = self._records(chat_id, user_id, [stack_key(stack_id)])
+        stack = records.get(stack_key(stack_id))
+        self._touch(chat_id, user_id, [(stack_key(stack_id), stack)])
+        intent_id = top_intent_id(stack)
+        if intent_id is None:
+            return deepcopy(stack), None
+        return deepcopy(stack), deepcopy(records.get(context_key(intent_id)))
+
+    async def save(
+            self, chat_id: int, user_id: int,
+            records: Sequence[Tuple[StorageKey, Optional[Record]]],
+            versions: Optional[Mapping[StorageKey, int]] = None,
+    ) -> None:
+        stored = self._records(
+            chat_id, user_id, [key for key, _ in records],
+        )
+        for key, version in (versions or {}).items():
+            if record_version(stored.get(key)) != version:
+                raise version_conflict(key)
+        for key, data in records:
+            if data is None:
+                stored.pop(key, None)
+            else:
+                stored[key] = deepcopy(data)
+        if stored:
+            self.users[chat_id, user_id] = stored
+        else:
+            self.users.pop((chat_id, user_id), None)
+        self._touch(chat_id, user_id, records)
+
+    async def purge_expired(
+            self, batch_size: int, on_purged: Optional[PurgeCallback] = None,
+    ) -> int:
+        removed = 0
+        while self.expiry and removed < batch_size:
+            expired = self.expiry.pop_expired()
+            if expired is None:
+                break
+            user_key, keys = expired
+            keys = self._remove(user_key, keys)
+            removed += len(keys)
+            if on_purged and keys:
+                on_purged(user_key, keys)
+        return removed
+
+    def _records(
+            self, chat_id: int, user_id: int, keys: Sequence[StorageKey],
+    ) -> Dict[StorageKey, Record]:
+        if self.expiry:
+            expired = self.expiry.pop_expired_of(chat_id, user_id, keys)
+            self._remove((chat_id, user_id), expired)
+        return self.users.get((chat_id, user_id), {})
+
+    def _remove(
+            self, user_key: UserKey, keys: Sequence[StorageKey],
+    ) -> List[StorageKey]:
+        records = self.users.get(user_key, {})
+        removed = [key for key in keys if records.pop(key, None) is not None]
+        if not records:
+            self.users.pop(user_key, None)
+        return removed
+
+    def _touch(
+            self, chat_id: int, user_id: int,
+            records: Iterable[Tuple[StorageKey, Optional[Record]]],
+    ) -> None:
+        if self.expiry:
+            self.expiry.touch(chat_id, user_id, records)
+
+
+# Loads stack and its top context in one call.
+# Top intent id of each stack is kept in a separate field
+# as serialized records cannot be parsed by redis
+REDIS_LOAD_STACK_SCRIPT = """
+local top = redis.call('HGET', KEYS[1], ARGV[2])
+if not top then
+    return {redis.call('HGET', KEYS[1], ARGV[1]), false}
+end
+return redis.call('HMGET', KEYS[1], ARGV[1], ARGV[3] .. top)
+"""
+# Checks version fields and applies changes if all of them match.
+# ARGV: ttl, number of checked fields, pairs of version field and
+# expected version, number of removed fields, removed fields,
+# pairs of field and value to set
+REDIS_SAVE_SCRIPT = """
+local checked = tonumber(ARGV[2])
+for i = 3, 2 + checked * 2, 2 do
+    local version = tonumber(redis.call('HGET', KEYS[1], ARGV[i])) or 0
+    if version ~= tonumber(ARGV[i + 1]) then
+        return ARGV[i]
+    end
+end
+local pos = 3 + checked * 2
+local removed = tonumber(ARGV[pos])
+if removed > 0 then
+    redis.call('HDEL', KEYS[1], unpack(ARGV, pos + 1, pos + removed))
+end
+pos = pos + removed + 1
+if pos <= #ARGV then
+    redis.call('HSET', KEYS[1], unpack(ARGV, pos))
+    if tonumber(ARGV[1]) > 0 then
+        redis.call('EXPIRE', KEYS[1], ARGV[1])
+    end
+end
+return false
+"""
+TOP_FIELD_PREFIX = "t:"
+VERSION_FIELD_PREFIX = "v:"
+
+
+class RedisDialogStorage(DialogStorage):
+    """
+    Keeps all dialogs of a user in chat as a single redis hash.
+
+    Works with any client implementing `redis.asyncio.Redis` interface.
+    Hash is expired `ttl` seconds after last save if it is set.
+    Records are stored using `CompactSerializer` by default,
+    so client should be created with `decode_responses=False`.
+    Record versions are duplicated in separate fields to be checked by redis.
+    """
+
+    def __init__(self, redis, prefix: str = "aiogd", ttl: Optional[int] = None,
+                 serializer: Optional[Serializer] = None):
+        self.redis = redis
+        self.prefix = prefix
+        self.ttl = ttl
+        if serializer is None:
+            serializer = CompactSerializer()
+        self.serializer = serializer
+
+    async def load(
+            self, chat_id: int, user_id: int, keys: Sequence[StorageKey],
+    ) -> List[Optional[Record]]:
+        raw_values = await self.redis.hmget(
+            self._key(chat_id, user_id), [self._field(key) for key in keys],
+        )
+        return [self._loads(key, raw) for key, raw in zip(keys, raw_values)]
+
+    async def load_stack_and_context(
+            self, chat_id: int, user_id: int, stack_id: str,
+    ) -> Tuple[Optional[Record], Optional[Record]]:
+        stack_raw, context_raw = await self.redis.eval(
+            REDIS_LOAD_STACK_SCRIPT, 1,
+            self._key(chat_id, user_id),
+            self._field(stack_key(stack_id)),
+            TOP_FIELD_PREFIX + stack_id,
+            self._field(context_key("")),
+        )
+        return (
+            self._loads(stack_key(stack_id), stack_raw),
+            self._loads(context_key(""), context_raw),
+        )
+
+    async def save(
+            self, chat_id: int, user_id: int,
+            records: Sequence[Tuple[StorageKey, Optional[Record]]],
+            versions: Optional[Mapping[StorageKey, int]] = None,
+    ) -> None:
+        if not records:
+            return
+        mapping = {}
+        removed = []
+        for key, data in records:
+            field = self._field(key)
+            if data is None:
+                removed.append(field)
+                removed.append(VERSION_FIELD_PREFIX + field)
+            else:
+                mapping[field] = self._dumps(key, data)
+                mapping[VERSION_FIELD_PREFIX + field] = record_version(data)
+            if key.type is RecordType.STACK:
+                intent_id = top_intent_id(data)
+                if intent_id is None:
+                    removed.append(TOP_FIELD_PREFIX + key.id)
+                else:
+                    mapping[TOP_FIELD_PREFIX + key.id] = intent_id
+
+        redis_key = self._key(chat_id, user_id)
+        if versions:
+            checked = []
+            for key, version in versions.items():
+                checked.append(VERSION_FIELD_PREFIX + self._field(key))
+                checked.append(version)
+            conflict = await self.redis.eval(
+                REDIS_SAVE_SCRIPT, 1, redis_key,
+                self.ttl or 0, len(versions), *checked,
+                len(removed), *removed,
+                *(item for pair in mapping.items() for item in pair),
+            )
+            if conflict:
+                raise version_conflict(conflict)
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if removed:
+                pipe.hdel(redis_key, *removed)
+            if mapping:
+                pipe.hset(redis_key, mapping=mapping)
+                if self.ttl:
+                    pipe.expire(redis_key, self.ttl)
+            await pipe.execute()
+
+    def _key(self, chat_id: int, user_id: int) -> str:
+        return f"{self.prefix}:{chat_id}:{user_id}"
+
+    def _field(self, key: StorageKey) -> str:
+        return f"{key.type.value}:{key.id}"
+
+    def _dumps(self, key: StorageKey, data: Record) -> bytes:
+        if key.type is RecordType.CONTEXT:
+            return self.serializer.dump_context(data)
+        return self.serializer.dump_stack(data)
+
+    def _loads(self, key: StorageKey, raw: Optional[bytes]) -> Optional[Record]:
+        if not raw:
+            return None
+        if key.type is RecordType.CONTEXT:
+            return self.serializer.load_context(raw)
+        return self.serializer.load_stack(raw)
@@ -0,0 +1,98 @@
+import pickle
+import time
+from typing import Dict, Optional, Tuple
+
+from cachetools import LRUCache
+
+from ..manager.protocols import GetterCacheProtocol
+
+
+# getters cache is not used until the first `CachedGetter` is created
+_cached_getters_created = False
+
+
+def user_scope(chat_id: int, user_id: int) -> str:
+    return f"{chat_id}:{user_id}"
+
+
+def cached_getter_created() -> None:
+    global _cached_getters_created
+    _cached_getters_created = True
+
+
+def has_cached_getters() -> bool:
+    """
+    Whether cache can contain data, so it should be invalidated
+    """
+    return _cached_getters_created
+
+
+class MemoryGetterCache(GetterCacheProtocol):
+    """
+    Keeps getters data in process memory for up to `maxsize` scopes
+    """
+
+    def __init__(self, maxsize=10240):
+        self.cache: LRUCache = LRUCache(maxsize=maxsize)
+
+    async def get(self, scope: str, key: str) -> Optional[Dict]:
+        entries: Optional[Dict[str, Tuple[float, Dict]]] = self.cache.get(scope)
+        if not entries or key not in entries:
+            return None
+        expires_at, data = entries[key]
+        if expires_at <= time.monotonic():
+            del entries[key]
+            return None
+        return dict(data)
+
+    async def set(self, scope: str, key: str, data: Dict, ttl: float) -> None:
+        now = time.monotonic()
+        entries = self.cache.get(scope)
+        if entries is None:
+            entries = self.cache[scope] = {}
+        else:
+            for old_key, (expires_at, _) in list(entries.items()):
+                if expires_at <= now:
+                    del entries[old_key]
+        entries[key] = (now + ttl, dict(data))
+
+    async def invalidate(self, scope: str) -> None:
+        self.cache.pop(scope, None)
+
+
+class RedisGetterCache(GetterCacheProtocol):
+    """
+    Keeps getters data in redis shared by all bot instances.
+
+    Data of a scope is kept in a single hash, which expires with
+    the last saved entry. Data is stored using pickle,
+    so client should be created with `decode_responses=False`.
+    Unpickling can run arbitrary code, so use it only with redis
+    which cannot be written by untrusted parties.
+    """
+
+    def __init__(self, redis, prefix: str = "aiogd_getters"):
+        self.redis = redis
+        self.prefix = prefix
+
+    async def get(self, scope: str, key: str) -> Optional[Dict]:
+        raw = await self.redis.hget(self._key(scope), key)
+        if not raw:
+            return None
+        expires_at, data = pickle.loads(raw)
+        if expires_at <= time.time():
+            return None
+        return data
+
+    async def set(self, scope: str, key: str, data: Dict, ttl: float) -> None:
+        raw = pickle.dumps((time.time() + ttl, data))
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self._key(scope), key, raw)
+            pipe.pexpire(self._key(scope), int(ttl * 1000) + 1)
+            await pipe.execute()
+
+    async def invalidate(self, scope: str) -> None:
+        await self.redis.delete(self._key(scope))
+
+    def _key(self, scope: str) -> str:
+        return f"{self.prefix}:{scope}"
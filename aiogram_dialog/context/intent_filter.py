@@ -1,21 +1,27 @@
 from logging import getLogger
-from typing import Optional, Type, Dict, Union, Any
+from typing import Optional, Type, Union, Any, Tuple
 
 from aiogram.dispatcher.filters import BoundFilter
 from aiogram.dispatcher.filters.state import StatesGroup
 from aiogram.dispatcher.handler import ctx_data
 from aiogram.dispatcher.middlewares import BaseMiddleware
-from aiogram.dispatcher.storage import BaseStorage
 from aiogram.types import Message, CallbackQuery, ChatMemberUpdated, Update
 from aiogram.types.base import TelegramObject
 
 from .context import Context
+from .dialog_storage import DialogStorage
 from .events import DialogUpdateEvent
-from .storage import StorageProxy
-from ..exceptions import InvalidStackIdError, OutdatedIntent, InvalidIntentIdError
+from .locks import LockManager, held_locks, stack_lock_key
+from .stack import Stack, DEFAULT_STACK_ID
+from .storage import StorageProxy, StateIndex
+from ..exceptions import (
+    InvalidStackIdError, OutdatedIntent, InvalidIntentIdError, LockTimeoutError,
+)
 from ..utils import remove_indent_id, get_chat
 
 STORAGE_KEY = "aiogd_storage_proxy"
+LOCK_KEY = "aiogd_stack_lock"
+LOADER_KEY = "aiogd_stack_loader"
 STACK_KEY = "aiogd_stack"
 CONTEXT_KEY = "aiogd_context"
 CALLBACK_DATA_KEY = "aiogd_original_callback_data"
@@ -23,6 +29,18 @@ CALLBACK_DATA_KEY = "aiogd_original_callback_data"
 logger = getLogger(__name__)
 
 
+async def load_intent_data(data: dict) -> None:
+    """
+    Lock and load dialog stack and context if it is not done yet.
+
+    It is done only by filters and handlers, so post process hooks which
+    save the data and release the lock are always called afterwards
+    """
+    loader = data.pop(LOADER_KEY, None)
+    if loader is not None:
+        await loader()
+
+
 class IntentFilter(BoundFilter):
     key = 'aiogd_intent_state_group'
 
@@ -34,6 +52,7 @@ class IntentFilter(BoundFilter):
         if self.intent_state_group is None:
             return True
         data = ctx_data.get()
+        await load_intent_data(data)
         context: Context = data.get(CONTEXT_KEY)
         if not context:
             return False
@@ -41,11 +60,60 @@ class IntentFilter(BoundFilter):
 
 
 class IntentMiddleware(BaseMiddleware):
-    def __init__(self, storage: BaseStorage,
-                 state_groups: Dict[str, Type[StatesGroup]]):
+    def __init__(self, storage: DialogStorage,
+                 state_index: StateIndex,
+                 lock_manager: Optional[LockManager] = None,
+                 check_versions: bool = False):
         super().__init__()
         self.storage = storage
-        self.state_groups = state_groups
+        self.state_index = state_index
+        self.lock_manager = lock_manager
+        self.check_versions = check_versions
+
+    async def _lock(self, proxy: StorageProxy, stack_id: str, data: dict):
+        if not self.lock_manager:
+            return
+        key = stack_lock_key(proxy.chat_id, proxy.user_id, stack_id)
+        await self.lock_manager.acquire(key)
+        data[LOCK_KEY] = key
+        held_locks.set(held_locks.get() | {key})
+
+    async def _unlock(self, data: dict):
+        key = data.pop(LOCK_KEY, None)
+        if key is not None:
+            held_locks.set(held_locks.get() - {key})
+            await self.lock_manager.release(key)
+
+    async def _load_by_intent(self, proxy: StorageProxy, intent_id: str,
+                              data: dict) -> Tuple[Context, Stack]:
+        # most of intents belong to default stack, so we lock it
+        # before we know the real one and load data again otherwise
+        await self._lock(proxy, DEFAULT_STACK_ID, data)
+        context, stack = await proxy.load_context_and_stack(intent_id)
+        if stack.id != DEFAULT_STACK_ID and self.lock_manager:
+            await self._unlock(data)
+            await self._lock(proxy, stack.id, data)
+            context, stack = await proxy.load_context_and_stack(intent_id)
+        return context, stack
+
+    def _set_loader(self, data: dict, load) -> None:
+        """
+        Postpone loading till filters are checked.
+
+        Post process hooks are skipped if pre process of any middleware
+        is cancelled, so the lock must not be taken here
+        """
+
+        async def loader():
+            try:
+                context, stack = await load()
+            except Exception:
+                await self._unlock(data)
+                raise
+            data[STACK_KEY] = stack
+            data[CONTEXT_KEY] = context
+
+        data[LOADER_KEY] = loader
 
     async def on_pre_process_message(self,
                                      event: Union[Message, ChatMemberUpdated],
@@ -55,21 +123,31 @@ class IntentMiddleware(BaseMiddleware):
             storage=self.storage,
             user_id=chat.id,
             chat_id=chat.id,
-            state_groups=self.state_groups,
+            state_index=self.state_index,
+            check_versions=self.check_versions,
         )
-        stack = await proxy.load_stack()
-        if stack.empty():
-            context = None
-        else:
-            context = await proxy.load_context(stack.last_intent_id())
         data[STORAGE_KEY] = proxy
-        data[STACK_KEY] = stack
-        data[CONTEXT_KEY] = context
+
+        async def load():
+            await self._lock(proxy, DEFAULT_STACK_ID, data)
+            stack, context = await proxy.load_stack_and_context()
+            return context, stack
+
+        self._set_loader(data, load)
+
+    async def on_process_message(self, event: Any, data: dict):
+        await load_intent_data(data)
 
     async def on_post_process_message(self, _, result, data: dict):
-        proxy: StorageProxy = data.pop(STORAGE_KEY)
-        await proxy.save_context(data.pop(CONTEXT_KEY))
-        await proxy.save_stack(data.pop(STACK_KEY))
+        data.pop(LOADER_KEY, None)
+        proxy: Optional[StorageProxy] = data.pop(STORAGE_KEY, None)
+        try:
+            if proxy and STACK_KEY in data:
+                await proxy.save_context_and_stack(
+                    data.pop(CONTEXT_KEY), data.pop(STACK_KEY),
+                )
+        finally:
+            await self._unlock(data)
 
     async def on_pre_process_aiogd_update(self, event: DialogUpdateEvent,
                                           data: dict):
@@ -78,13 +156,23 @@ class IntentMiddleware(BaseMiddleware):
             storage=self.storage,
             user_id=chat.id,
             chat_id=chat.id,
-            state_groups=self.state_groups,
+            state_index=self.state_index,
+            check_versions=self.check_versions,
         )
         data[STORAGE_KEY] = proxy
+        self._set_loader(
+            data, lambda: self._load_for_update(proxy, event, data),
+        )
+
+    async def _load_for_update(
+            self, proxy: StorageProxy, event: DialogUpdateEvent, data: dict,
+    ) -> Tuple[Optional[Context], Stack]:
         if event.intent_id is not None:
-            context = await proxy.load_context(event.intent_id)
-            stack = await proxy.load_stack(context.stack_id)
+            context, stack = await self._load_by_intent(
+                proxy, event.intent_id, data,
+            )
         elif event.stack_id is not None:
+            await self._lock(proxy, event.stack_id, data)
             stack = await proxy.load_stack(event.stack_id)
             if stack.empty():
                 if event.intent_id is not None:
@@ -107,9 +195,7 @@ class IntentMiddleware(BaseMiddleware):
         else:
             raise InvalidStackIdError(
                 f"Both stack id and intent id are None: {event}")
-
-        data[STACK_KEY] = stack
-        data[CONTEXT_KEY] = context
+        return context, stack
 
     async def on_pre_process_callback_query(self, event: CallbackQuery,
                                             data: dict):
@@ -118,15 +204,26 @@ class IntentMiddleware(BaseMiddleware):
             storage=self.storage,
             user_id=chat.id,
             chat_id=chat.id,
-            state_groups=self.state_groups,
+            state_index=self.state_index,
+            check_versions=self.check_versions,
         )
         data[STORAGE_KEY] = proxy
 
         original_data = event.data
         intent_id, callback_data = remove_indent_id(event.data)
         if intent_id:
-            context = await proxy.load_context(intent_id)
-            stack = await proxy.load_stack(context.stack_id)
+            # filters are checked with callback data of widgets
+            event.data = callback_data
+        data[CALLBACK_DATA_KEY] = original_data
+
+        async def load():
+            if not intent_id:
+                await self._lock(proxy, DEFAULT_STACK_ID, data)
+                stack, context = await proxy.load_stack_and_context()
+                return context, stack
+            context, stack = await self._load_by_intent(
+                proxy, intent_id, data,
+            )
             try:
                 last_intent_id = stack.last_intent_id()
             except IndexError as e:
@@ -135,27 +232,23 @@ class IntentMiddleware(BaseMiddleware):
             if last_intent_id != intent_id:
                 raise OutdatedIntent("Outdated intent id (%s) for stack ('%s')",
                                      intent_id, stack.id)
+            return context, stack
 
-            event.data = callback_data
-        else:
-            stack = await proxy.load_stack()
-            if stack.empty():
-                context = None
-            else:
-                context = await proxy.load_context(stack.last_intent_id())
-        data[STACK_KEY] = stack
-        data[CONTEXT_KEY] = context
-        data[CALLBACK_DATA_KEY] = original_data
+        self._set_loader(data, load)
 
     on_pre_process_my_chat_member = on_pre_process_message
 
+    on_process_callback_query = on_process_message
+    on_process_aiogd_update = on_process_message
+    on_process_my_chat_member = on_process_message
+
     on_post_process_callback_query = on_post_process_message
     on_post_process_aiogd_update = on_post_process_message
     on_post_process_my_chat_member = on_post_process_message
 
     async def on_pre_process_error(self, update: Update, error: Exception,
                                    data: dict) -> None:
-        if isinstance(error, InvalidStackIdError):
+        if isinstance(error, (InvalidStackIdError, LockTimeoutError)):
             return
 
         event = (
@@ -172,30 +265,34 @@ class IntentMiddleware(BaseMiddleware):
             storage=self.storage,
             user_id=event.from_user.id,
             chat_id=chat.id,
-            state_groups=self.state_groups,
+            state_index=self.state_index,
+            check_versions=self.check_versions,
         )
         data[STORAGE_KEY] = proxy
 
         if isinstance(error, OutdatedIntent):
-            stack = await proxy.load_stack(stack_id=error.stack_id)
+            stack_id = error.stack_id
         else:
-            stack = await proxy.load_stack()
-        if stack.empty():
-            context = None
-        else:
-            try:
-                context = await proxy.load_context(stack.last_intent_id())
-            except:
+            stack_id = DEFAULT_STACK_ID
+
+        async def load():
+            await self._lock(proxy, stack_id, data)
+            stack = await proxy.load_stack(stack_id=stack_id)
+            if stack.empty():
                 context = None
-        data[STACK_KEY] = stack
-        data[CONTEXT_KEY] = context
+            else:
+                try:
+                    context = await proxy.load_context(stack.last_intent_id())
+                except:
+                    context = None
+            return context, stack
+
+        self._set_loader(data, load)
+
+    async def on_process_error(self, update: Update, error: Exception,
+                               data: dict) -> None:
+        await load_intent_data(data)
 
     async def on_post_process_error(self, event: Any, error: Exception,
                                     result: list, data: dict) -> None:
-        proxy: StorageProxy = data.pop(STORAGE_KEY, None)
-        if not proxy:
-            return
-        context = data.pop(CONTEXT_KEY)
-        if context is not None:
-            await proxy.save_context(context)
-        await proxy.save_stack(data.pop(STACK_KEY))
+        await self.on_post_process_message(event, result, data)
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Protocol
+
+from ..exceptions import LockTimeoutError
+
+# keys of stack locks held by the update processed in current context,
+# tasks started by its handlers inherit them
+held_locks: ContextVar[FrozenSet[str]] = ContextVar(
+    "aiogd_held_locks", default=frozenset(),
+)
+
+
+def stack_lock_key(chat_id: int, user_id: int, stack_id: str) -> str:
+    return f"{chat_id}:{user_id}:{stack_id}"
+
+
+class LockManager(Protocol):
+    """
+    Keyed locks held while an update of a dialog stack is processed.
+
+    Implementation shared between processes can be used
+    to run multiple bot workers on the same storage.
+    """
+
+    async def acquire(self, key: str) -> None:
+        raise NotImplementedError
+
+    async def release(self, key: str) -> None:
+        raise NotImplementedError
+
+
+@dataclass
+class LockStats:
+    acquired: int = 0  # total number of acquired locks
+    contended: int = 0  # how many of them were waiting for another holder
+    timeouts: int = 0
+    total_wait: float = 0
+    max_wait: float = 0
+
+
+class _KeyLock:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0  # holder and waiters
+
+
+class MemoryLockManager(LockManager):
+    """
+    Locks for a single process.
+
+    Lock is kept only while it is held or awaited,
+    so the table size is limited by the number of concurrent updates.
+    """
+
+    def __init__(self, timeout: Optional[float] = 30):
+        self.timeout = timeout
+        self.locks: Dict[str, _KeyLock] = {}
+        self.stats = LockStats()
+
+    async def acquire(self, key: str) -> None:
+        key_lock = self.locks.get(key)
+        if key_lock is None:
+            key_lock = self.locks[key] = _KeyLock()
+        key_lock.users += 1
+        if not key_lock.lock.locked():
+            await key_lock.lock.acquire()
+            self.stats.acquired += 1
+            return
+
+        self.stats.contended += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(key_lock.lock.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            self._leave(key, key_lock)
+            raise LockTimeoutError(f"Cannot acquire lock for `{key}`")
+        except BaseException:
+            self._leave(key, key_lock)
+            raise
+        wait = time.monotonic() - started
+        self.stats.acquired += 1
+        self.stats.total_wait += wait
+        self.stats.max_wait = max(self.stats.max_wait, wait)
+
+    async def release(self, key: str) -> None:
+        key_lock = self.locks[key]
+        key_lock.lock.release()
+        self._leave(key, key_lock)
+
+    def _leave(self, key: str, key_lock: _KeyLock) -> None:
+        key_lock.users -= 1
+        if not key_lock.users:
+            del self.locks[key]
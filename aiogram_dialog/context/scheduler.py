@@ -0,0 +1,332 @@
+import asyncio
+import heapq
+import io
+import time
+from dataclasses import dataclass, field
+from enum import IntEnum
+from itertools import count
+from logging import getLogger
+from typing import (
+    Any, Awaitable, Callable, Dict, List, Optional, Protocol, Tuple, TypeVar,
+)
+
+from aiogram import Bot
+from aiogram.types import InputFile, InputMedia
+from aiogram.utils.exceptions import RetryAfter
+from cachetools import TTLCache
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+# tolerance of token count, so waiting for computed time is always enough
+TOKENS_EPSILON = 1e-9
+
+# Bot methods sending, editing or deleting messages
+SCHEDULED_METHODS = frozenset({
+    "send_message", "send_animation", "send_audio", "send_document",
+    "send_photo", "send_video",
+    "edit_message_text", "edit_message_caption", "edit_message_media",
+    "edit_message_reply_markup", "delete_message",
+})
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # answers to user actions
+    BACKGROUND = 1  # updates from `BgManager`
+
+
+class Clock(Protocol):
+    def monotonic(self) -> float:
+        raise NotImplementedError
+
+    async def sleep(self, delay: float) -> None:
+        raise NotImplementedError
+
+
+class SystemClock(Clock):
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, delay: float) -> None:
+        await asyncio.sleep(delay)
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second with bursts up to `capacity`
+    """
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = now
+
+    def reserve(self, now: float) -> float:
+        """
+        Take a token if it is available, otherwise return time to wait
+        """
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate,
+        )
+        self.updated = now
+        if self.tokens >= 1 - TOKENS_EPSILON:
+            self.tokens = max(self.tokens - 1, 0)
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def block(self, until: float) -> None:
+        """
+        Stop giving tokens until the time, e.g. when telegram asks to retry
+        """
+        self.blocked_until = max(self.blocked_until, until)
+        self.tokens = 0
+        self.updated = self.blocked_until
+
+
+@dataclass
+class SchedulerStats:
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    in_flight: int = 0
+    # requests waiting for tokens by priority
+    waiting: Dict[Priority, int] = field(
+        default_factory=lambda: dict.fromkeys(Priority, 0),
+    )
+
+
+class RequestScheduler:
+    """
+    Limits rate of requests to Bot API made by dialogs.
+
+    Each request takes a token of its chat bucket and of the global one.
+    Global tokens are given to interactive requests first.
+    Requests to the same chat are sent one by one,
+    interactive ones first and in order within the same priority.
+    When telegram responds with `RetryAfter`, the chat is paused
+    and request is repeated up to `max_retries` times unless `retry`
+    is disabled for it.
+    """
+
+    def __init__(
+            self,
+            global_rate: float = 30,
+            global_burst: float = 30,
+            chat_rate: float = 1,
+            chat_burst: float = 3,
+            max_retries: int = 3,
+            clock: Optional[Clock] = None,
+            max_chats: int = 100000,
+    ):
+        if clock is None:
+            clock = SystemClock()
+        self.clock = clock
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(
+            global_rate, global_burst, clock.monotonic(),
+        )
+        # idle bucket is full after this time, so it can be dropped
+        self.chat_buckets: TTLCache = TTLCache(
+            maxsize=max_chats, ttl=chat_burst / chat_rate,
+            timer=clock.monotonic,
+        )
+        # paused buckets are kept till the end of pause instead
+        self.blocked_buckets: Dict[int, TokenBucket] = {}
+        # requests waiting for their chat, chat is busy while it is present
+        self._chat_waiters: Dict[
+            Optional[int], List[Tuple[Priority, int, asyncio.Future]],
+        ] = {}
+        self.stats = SchedulerStats()
+        self._waiters: List[Tuple[Priority, int, asyncio.Future]] = []
+        self._order = count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def queue_depth(self, priority: Optional[Priority] = None) -> int:
+        """
+        Number of requests waiting to be sent
+        """
+        if priority is None:
+            return sum(self.stats.waiting.values())
+        return self.stats.waiting[priority]
+
+    async def call(
+            self, chat_id: Optional[int], priority: Priority,
+            request: Callable[[], Awaitable[T]],
+            retry: bool = True,
+    ) -> T:
+        self.stats.waiting[priority] += 1
+        waiting = True
+        try:
+            await self._acquire_chat(chat_id, priority)
+        except BaseException:
+            self.stats.waiting[priority] -= 1
+            raise
+        try:
+            for attempt in count():
+                if chat_id is not None:
+                    await self._wait_chat(chat_id)
+                await self._wait_global(priority)
+                if waiting:
+                    self.stats.waiting[priority] -= 1
+                    waiting = False
+                self.stats.in_flight += 1
+                try:
+                    result = await request()
+                except RetryAfter as e:
+                    # next requests to the chat are paused anyway
+                    self._pause(chat_id, e.timeout)
+                    if not retry or attempt >= self.max_retries:
+                        self.stats.failed += 1
+                        raise
+                    logger.warning(
+                        "Flood control in chat %s, retry in %s seconds",
+                        chat_id, e.timeout,
+                    )
+                    self.stats.retried += 1
+                    continue
+                except Exception:
+                    self.stats.failed += 1
+                    raise
+                finally:
+                    self.stats.in_flight -= 1
+                self.stats.sent += 1
+                return result
+        finally:
+            if waiting:
+                self.stats.waiting[priority] -= 1
+            self._release_chat(chat_id)
+
+    async def _acquire_chat(self, chat_id: Optional[int],
+                            priority: Priority) -> None:
+        waiters = self._chat_waiters.get(chat_id)
+        if waiters is None:
+            self._chat_waiters[chat_id] = []
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(waiters, (priority, next(self._order), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release_chat(chat_id)  # chat was already passed to us
+            raise
+
+    def _release_chat(self, chat_id: Optional[int]) -> None:
+        waiters = self._chat_waiters[chat_id]
+        while waiters:
+            _, _, future = heapq.heappop(waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        del self._chat_waiters[chat_id]
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.blocked_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(
+                self.chat_rate, self.chat_burst, self.clock.monotonic(),
+            )
+        self._keep_bucket(chat_id, bucket)
+        return bucket
+
+    def _keep_bucket(self, chat_id: int, bucket: TokenBucket) -> None:
+        now = self.clock.monotonic()
+        if bucket.blocked_until <= now:
+            self.blocked_buckets.pop(chat_id, None)
+            # refresh expiration on each use
+            self.chat_buckets[chat_id] = bucket
+            return
+        # cache would drop it before the pause ends and create a full one
+        self.chat_buckets.pop(chat_id, None)
+        self.blocked_buckets[chat_id] = bucket
+        for blocked_chat, blocked in list(self.blocked_buckets.items()):
+            if blocked.blocked_until <= now:
+                del self.blocked_buckets[blocked_chat]
+                self.chat_buckets[blocked_chat] = blocked
+
+    def _pause(self, chat_id: Optional[int], delay: float) -> None:
+        until = self.clock.monotonic() + delay
+        if chat_id is None:
+            self.global_bucket.block(until)
+            return
+        bucket = self._chat_bucket(chat_id)
+        bucket.block(until)
+        self._keep_bucket(chat_id, bucket)
+
+    async def _wait_chat(self, chat_id: int) -> None:
+        while True:
+            delay = self._chat_bucket(chat_id).reserve(self.clock.monotonic())
+            if not delay:
+                return
+            await self.clock.sleep(delay)
+
+    async def _wait_global(self, priority: Priority) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), future))
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await future
+
+    async def _dispatch(self) -> None:
+        try:
+            while self._waiters:
+                if self._waiters[0][2].done():  # cancelled
+                    heapq.heappop(self._waiters)
+                    continue
+                delay = self.global_bucket.reserve(self.clock.monotonic())
+                if delay:
+                    await self.clock.sleep(delay)
+                    continue
+                _, _, future = heapq.heappop(self._waiters)
+                future.set_result(None)
+        finally:
+            self._dispatcher = None
+
+
+def _is_upload(value: Any) -> bool:
+    if isinstance(value, (InputFile, io.IOBase)):
+        return True
+    if isinstance(value, InputMedia):
+        return any(True for _ in value.get_files())
+    return False
+
+
+class ScheduledBot:
+    """
+    Bot proxy sending messages through `RequestScheduler`.
+
+    Requests uploading files are not retried,
+    as the file is already read by the first attempt.
+    """
+
+    def __init__(self, bot: Bot, scheduler: RequestScheduler,
+                 priority: Priority):
+        self.bot = bot
+        self.scheduler = scheduler
+        self.priority = priority
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self.bot, name)
+        if name not in SCHEDULED_METHODS:
+            return method
+
+        async def scheduled(*args, **kwargs):
+            chat_id = kwargs.get("chat_id", args[0] if args else None)
+            upload = any(
+                _is_upload(value) for value in (*args, *kwargs.values())
+            )
+            return await self.scheduler.call(
+                chat_id, self.priority, lambda: method(*args, **kwargs),
+                retry=not upload,
+            )
+
+        return scheduled
@@ -0,0 +1,146 @@
+import json
+import struct
+import zlib
+from typing import Any, Dict, Optional, Protocol, Tuple, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+Record = Dict[str, Any]
+Raw = Union[bytes, str]
+
+JSON_BODY = 0
+MSGPACK_BODY = 1
+
+HEADER = struct.Struct(">BB")  # payload version, body encoding
+CONTEXT_FIELDS = {
+    1: (
+        "_intent_id", "_stack_id", "state",
+        "start_data", "dialog_data", "widget_data",
+    ),
+    2: (
+        "_intent_id", "_stack_id", "state",
+        "start_data", "dialog_data", "widget_data", "_version",
+    ),
+    3: (
+        "_intent_id", "_stack_id", "state",
+        "start_data", "dialog_data", "widget_data", "_version",
+    ),
+}
+STACK_FIELDS = {
+    1: (
+        "_id", "intents", "last_message_id", "last_media_id",
+        "last_media_unique_id", "last_income_media_group_id",
+    ),
+    2: (
+        "_id", "intents", "last_message_id", "last_media_id",
+        "last_media_unique_id", "last_income_media_group_id", "_version",
+    ),
+    3: (
+        "_id", "intents", "last_message_id", "last_media_id",
+        "last_media_unique_id", "last_income_media_group_id", "_version",
+        "last_render_key",
+    ),
+}
+
+
+def state_id(state: str) -> int:
+    """
+    Stable numeric id of state, it is not changed when other states are added
+    """
+    return zlib.crc32(state.encode())
+
+
+class Serializer(Protocol):
+    def dump_context(self, data: Record) -> bytes:
+        raise NotImplementedError
+
+    def load_context(self, raw: Raw) -> Record:
+        raise NotImplementedError
+
+    def dump_stack(self, data: Record) -> bytes:
+        raise NotImplementedError
+
+    def load_stack(self, raw: Raw) -> Record:
+        raise NotImplementedError
+
+
+class JsonSerializer(Serializer):
+    """
+    Stores records as JSON objects with full field names and states
+    """
+
+    def dump_context(self, data: Record) -> bytes:
+        return self._dumps(data)
+
+    def load_context(self, raw: Raw) -> Record:
+        return json.loads(raw)
+
+    def dump_stack(self, data: Record) -> bytes:
+        return self._dumps(data)
+
+    def load_stack(self, raw: Raw) -> Record:
+        return json.loads(raw)
+
+    def _dumps(self, data: Record) -> bytes:
+        return json.dumps(data, separators=(",", ":")).encode()
+
+
+class CompactSerializer(Serializer):
+    """
+    Stores records as versioned arrays of field values.
+
+    State is replaced with its numeric id (see `state_id`).
+    Body is packed with `msgpack` if it is installed or as JSON otherwise.
+    Records stored by `JsonSerializer` are loaded as well.
+    """
+
+    version = 3
+
+    def __init__(self, use_msgpack: Optional[bool] = None):
+        if use_msgpack is None:
+            use_msgpack = msgpack is not None
+        elif use_msgpack and msgpack is None:
+            raise ValueError("msgpack is not installed")
+        self.body_encoding = MSGPACK_BODY if use_msgpack else JSON_BODY
+
+    def dump_context(self, data: Record) -> bytes:
+        data = dict(data, state=state_id(data["state"]))
+        return self._dumps(CONTEXT_FIELDS[self.version], data)
+
+    def load_context(self, raw: Raw) -> Record:
+        return self._loads(CONTEXT_FIELDS, raw)
+
+    def dump_stack(self, data: Record) -> bytes:
+        return self._dumps(STACK_FIELDS[self.version], data)
+
+    def load_stack(self, raw: Raw) -> Record:
+        return self._loads(STACK_FIELDS, raw)
+
+    def _dumps(self, fields: Tuple[str, ...], data: Record) -> bytes:
+        values = [data[f] for f in fields]
+        if self.body_encoding == MSGPACK_BODY:
+            body = msgpack.packb(values, use_bin_type=True)
+        else:
+            body = json.dumps(values, separators=(",", ":")).encode()
+        return HEADER.pack(self.version, self.body_encoding) + body
+
+    def _loads(self, fields: Dict[int, Tuple[str, ...]], raw: Raw) -> Record:
+        if isinstance(raw, str):
+            raw = raw.encode()
+        if raw[:1] == b"{":  # stored by JsonSerializer
+            return json.loads(raw)
+        version, body_encoding = HEADER.unpack_from(raw)
+        if version not in fields:
+            raise ValueError(f"Unsupported record version: {version}")
+        body = raw[HEADER.size:]
+        if body_encoding == MSGPACK_BODY:
+            if msgpack is None:
+                raise ValueError("msgpack is required to load record")
+            # data of widgets and dialogs can have non-str keys
+            values = msgpack.unpackb(body, raw=False, strict_map_key=False)
+        else:
+            values = json.loads(body)
+        return dict(zip(fields[version], values))
@@ -42,6 +42,8 @@ class Stack:
     last_media_id: Optional[str] = field(compare=False, default=None)
     last_media_unique_id: Optional[str] = field(compare=False, default=None)
     last_income_media_group_id: Optional[str] = field(compare=False, default=None)
+    last_render_key: Optional[str] = field(compare=False, default=None)
+    _version: int = field(compare=False, default=0)
 
     @property
     def id(self):
@@ -1,84 +1,200 @@
-from copy import copy
-from typing import Dict, Type, Optional
+from copy import copy, deepcopy
+from typing import Dict, Type, Optional, List, Tuple, Union, Iterable
 
 from aiogram.dispatcher.filters.state import State, StatesGroup
-from aiogram.dispatcher.storage import BaseStorage
 
 from .context import Context
+from .dialog_storage import (
+    DialogStorage, Record, RecordType, StorageKey,
+    context_key, stack_key, record_version,
+)
+from .serializers import state_id
 from .stack import Stack, DEFAULT_STACK_ID
 from ..exceptions import UnknownState, UnknownIntent
 
 
+class StateIndex:
+    """
+    Finds states by name or by numeric id (see `state_id`)
+    """
+
+    def __init__(self, groups: Iterable[Type[StatesGroup]] = ()):
+        self.by_name: Dict[str, State] = {}
+        self.by_id: Dict[int, State] = {}
+        for group in groups:
+            self.add_group(group)
+
+    def add_group(self, group: Type[StatesGroup]) -> None:
+        for state in group.all_states:
+            id_ = state_id(state.state)
+            other = self.by_id.get(id_, state)
+            if other.state != state.state:
+                raise ValueError(
+                    f"States `{state.state}` and `{other.state}` "
+                    f"have the same id {id_}"
+                )
+            self.by_name[state.state] = state
+            self.by_id[id_] = state
+
+    def get(self, state: Union[str, int]) -> State:
+        if isinstance(state, int):  # stored by compact serializer
+            found = self.by_id.get(state)
+        else:
+            found = self.by_name.get(state)
+        if found is None:
+            raise UnknownState(f"Unknown state {state}")
+        return found
+
+
 class StorageProxy:
-    def __init__(self, storage: BaseStorage,
+    """
+    Loads and saves dialogs of a user in chat.
+
+    Each save increases version of a record. With `check_versions`
+    records which were loaded are saved only if they were not changed
+    since, otherwise `VersionConflictError` is raised.
+    """
+
+    def __init__(self, storage: DialogStorage,
                  user_id: int, chat_id: int,
-                 state_groups: Dict[str, Type[StatesGroup]]):
+                 state_index: StateIndex,
+                 check_versions: bool = False):
         self.storage = storage
-        self.state_groups = state_groups
+        self.state_index = state_index
         self.user_id = user_id
         self.chat_id = chat_id
+        self.check_versions = check_versions
+        # records as they were loaded or saved, used to skip no-op writes
+        self._snapshots: Dict[StorageKey, Optional[Record]] = {}
 
     async def load_context(self, intent_id: str) -> Context:
-        data = await self.storage.get_data(
-            chat=self.chat_id,
-            user=self._context_key(intent_id)
+        data, = await self.storage.load(
+            self.chat_id, self.user_id, [context_key(intent_id)],
         )
-        if not data:
-            raise UnknownIntent(f"Context not found for intent id: {intent_id}")
-        data["state"] = self._state(data["state"])
-        return Context(**data)
+        return self._context(intent_id, data)
 
     async def load_stack(self, stack_id: str = DEFAULT_STACK_ID) -> Stack:
-        data = await self.storage.get_data(
-            chat=self.chat_id,
-            user=self._stack_key(stack_id)
+        data, = await self.storage.load(
+            self.chat_id, self.user_id, [stack_key(stack_id)],
         )
-        if not data:
-            return Stack(_id=stack_id)
-        return Stack(**data)
+        return self._stack(stack_id, data)
 
-    async def save_context(self, context: Optional[Context]) -> None:
-        if not context:
-            return
-        data = copy(vars(context))
-        data["state"] = data["state"].state
-        await self.storage.set_data(
-            chat=self.chat_id,
-            user=self._context_key(context.id),
-            data=data,
+    async def load_context_and_stack(
+            self, intent_id: str,
+    ) -> Tuple[Context, Stack]:
+        """
+        Load context and the stack it belongs to.
+
+        Default stack is requested together with context,
+        so only intents from other stacks require one more request
+        """
+        context_data, stack_data = await self.storage.load(
+            self.chat_id, self.user_id,
+            [context_key(intent_id), stack_key(DEFAULT_STACK_ID)],
+        )
+        context = self._context(intent_id, context_data)
+        if context.stack_id != DEFAULT_STACK_ID:
+            return context, await self.load_stack(context.stack_id)
+        return context, self._stack(DEFAULT_STACK_ID, stack_data)
+
+    async def load_stack_and_context(
+            self, stack_id: str = DEFAULT_STACK_ID,
+    ) -> Tuple[Stack, Optional[Context]]:
+        """
+        Load stack and its top context if the stack is not empty.
+        """
+        stack_data, context_data = await self.storage.load_stack_and_context(
+            self.chat_id, self.user_id, stack_id,
         )
+        stack = self._stack(stack_id, stack_data)
+        if stack.empty():
+            return stack, None
+        return stack, self._context(stack.last_intent_id(), context_data)
+
+    async def save_context(self, context: Optional[Context]) -> None:
+        await self.save_context_and_stack(context, None)
 
     async def remove_context(self, intent_id: str):
-        await self.storage.reset_data(chat=self.chat_id, user=self._context_key(intent_id))
+        await self._save([(context_key(intent_id), None)])
 
     async def remove_stack(self, stack_id: str):
-        await self.storage.reset_data(chat=self.chat_id, user=self._stack_key(stack_id))
+        await self._save([(stack_key(stack_id), None)])
 
     async def save_stack(self, stack: Optional[Stack]) -> None:
-        if not stack:
+        await self.save_context_and_stack(None, stack)
+
+    async def save_context_and_stack(
+            self, context: Optional[Context], stack: Optional[Stack],
+    ) -> None:
+        """
+        Save changed context and stack in one request
+        """
+        records: List[Tuple[StorageKey, Optional[Record]]] = []
+        if context:
+            records.append((
+                context_key(context.id), self._context_data(context),
+            ))
+        if stack:
+            records.append((stack_key(stack.id), self._stack_data(stack)))
+        records = [
+            (key, data) for key, data in records
+            if self._is_changed(key, data)
+        ]
+        for _, data in records:
+            if data:
+                data["_version"] += 1
+        await self._save(records)
+        for key, data in records:
+            if not data:
+                continue
+            if key.type is RecordType.CONTEXT:
+                context._version = data["_version"]
+            else:
+                stack._version = data["_version"]
+
+    async def _save(
+            self, records: List[Tuple[StorageKey, Optional[Record]]],
+    ) -> None:
+        if not records:
             return
+        versions = None
+        if self.check_versions:
+            versions = {
+                key: record_version(self._snapshots[key])
+                for key, _ in records
+                if key in self._snapshots
+            }
+        await self.storage.save(self.chat_id, self.user_id, records, versions)
+        for key, data in records:
+            self._remember(key, data)
+
+    def _remember(self, key: StorageKey, data: Optional[Record]) -> None:
+        self._snapshots[key] = deepcopy(data)
+
+    def _is_changed(self, key: StorageKey, data: Optional[Record]) -> bool:
+        return key not in self._snapshots or self._snapshots[key] != data
+
+    def _context(self, intent_id: str, data: Optional[Record]) -> Context:
+        if not data:
+            raise UnknownIntent(f"Context not found for intent id: {intent_id}")
+        state = self.state_index.get(data["state"])
+        data["state"] = state.state
+        self._remember(context_key(intent_id), data)
+        data["state"] = state
+        return Context(**data)
+
+    def _stack(self, stack_id: str, data: Optional[Record]) -> Stack:
+        self._remember(stack_key(stack_id), data)
+        if not data:
+            return Stack(_id=stack_id)
+        return Stack(**data)
+
+    def _context_data(self, context: Context) -> Record:
+        data = copy(vars(context))
+        data["state"] = data["state"].state
+        return data
+
+    def _stack_data(self, stack: Stack) -> Optional[Record]:
         if stack.empty() and not stack.last_message_id:
-            await self.storage.reset_data(
-                chat=self.chat_id,
-                user=self._stack_key(stack.id),
-            )
-        else:
-            data = copy(vars(stack))
-            await self.storage.set_data(
-                chat=self.chat_id,
-                user=self._stack_key(stack.id),
-                data=data,
-            )
-
-    def _context_key(self, intent_id: str) -> str:
-        return f"{self.user_id}:aiogd:context:{intent_id}"
-
-    def _stack_key(self, stack_id: str) -> str:
-        return f"{self.user_id}:aiogd:stack:{stack_id}"
-
-    def _state(self, state: str) -> State:
-        group, *_ = state.partition(":")
-        for real_state in self.state_groups[group].all_states:
-            if real_state.state == state:
-                return real_state
-        raise UnknownState(f"Unknown state {state}")
+            return None  # nothing to keep
+        return copy(vars(stack))
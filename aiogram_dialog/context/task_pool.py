@@ -0,0 +1,173 @@
+import asyncio
+from collections import deque
+from contextvars import Context, ContextVar, copy_context
+from dataclasses import dataclass
+from enum import Enum
+from logging import getLogger
+from typing import Awaitable, Callable, Deque, List, Optional, Set, Tuple
+
+from ..exceptions import TaskPoolClosedError, TaskPoolOverflowError
+
+logger = getLogger(__name__)
+
+Job = Callable[[], Awaitable]
+
+# pool running current job
+current_pool: ContextVar[Optional["TaskPool"]] = ContextVar(
+    "aiogd_task_pool", default=None,
+)
+
+
+class OverflowPolicy(Enum):
+    # submitter waits for a free place in queue,
+    # jobs of the pool submitting more jobs do not wait to avoid deadlock
+    WAIT = "wait"
+    DROP_NEW = "drop_new"  # submitted job is dropped
+    DROP_OLDEST = "drop_oldest"  # the oldest queued job is dropped
+    RAISE = "raise"  # `TaskPoolOverflowError` is raised
+
+
+@dataclass
+class TaskPoolStats:
+    in_flight: int = 0
+    queued: int = 0
+    completed: int = 0
+    failed: int = 0
+    dropped: int = 0
+
+
+class TaskPool:
+    """
+    Runs at most `max_concurrency` jobs at a time.
+
+    Other jobs wait in a queue of `max_queue` size,
+    when it is full `overflow` policy is applied.
+    Jobs are run in context copied on submit, errors are logged.
+    After `drain` is called only running jobs can submit new ones.
+    """
+
+    def __init__(
+            self,
+            max_concurrency: int = 100,
+            max_queue: int = 10000,
+            overflow: OverflowPolicy = OverflowPolicy.WAIT,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be positive")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.stats = TaskPoolStats()
+        self._queue: Deque[Tuple[Job, Context]] = deque()
+        self._space_waiters: Deque[asyncio.Future] = deque()
+        self._tasks: Set[asyncio.Task] = set()
+        self._drain_waiters: List[asyncio.Future] = []
+        self.closed = False
+
+    async def submit(self, job: Job, wait: bool = True) -> None:
+        """
+        Start or queue the job.
+
+        With `wait=False` queue size is exceeded instead of waiting
+        for a free place, e.g. if running jobs can wait for the submitter
+        """
+        self._check_closed()
+        context = copy_context()
+        if len(self._tasks) < self.max_concurrency:
+            self._start(job, context)
+            return
+        while len(self._queue) >= self.max_queue:
+            if self.overflow is OverflowPolicy.WAIT:
+                if current_pool.get() is self or not wait:
+                    # all running jobs could wait for each other,
+                    # so queue size is exceeded instead
+                    break
+                await self._wait_space()
+                self._check_closed()
+                if len(self._tasks) < self.max_concurrency:
+                    self._start(job, context)
+                    return
+            elif self.overflow is OverflowPolicy.DROP_NEW:
+                self._drop()
+                return
+            elif self.overflow is OverflowPolicy.DROP_OLDEST and self._queue:
+                self._queue.popleft()
+                self._drop()
+            elif self.overflow is OverflowPolicy.DROP_OLDEST:
+                self._drop()  # queue has no place at all
+                return
+            else:
+                raise TaskPoolOverflowError(
+                    f"Task pool queue is full ({self.max_queue} jobs)",
+                )
+        self._queue.append((job, context))
+        self.stats.queued = len(self._queue)
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop accepting new jobs from outside of the pool
+        and wait till all queued and running ones are finished
+        """
+        self.closed = True
+        if not self._tasks:
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+        await asyncio.wait_for(waiter, timeout)
+
+    def _check_closed(self) -> None:
+        # running jobs can still submit more, they are waited by `drain`
+        if self.closed and current_pool.get() is not self:
+            raise TaskPoolClosedError("Task pool is closed")
+
+    async def _run(self, job: Job) -> None:
+        current_pool.set(self)
+        await job()
+
+    def _start(self, job: Job, context: Context) -> None:
+        # task copies current context, so it is created inside the saved one
+        task = context.run(asyncio.create_task, self._run(job))
+        self._tasks.add(task)
+        self.stats.in_flight = len(self._tasks)
+        task.add_done_callback(self._job_done)
+
+    def _drop(self) -> None:
+        self.stats.dropped += 1
+        logger.warning("Task pool queue is full, job is dropped")
+
+    async def _wait_space(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._space_waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._wake_waiter()  # pass the place to the next one
+            raise
+
+    def _wake_waiter(self) -> None:
+        while self._space_waiters:
+            waiter = self._space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _job_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if task.cancelled():
+            self.stats.failed += 1
+        elif task.exception():
+            self.stats.failed += 1
+            logger.error("Job of task pool failed", exc_info=task.exception())
+        else:
+            self.stats.completed += 1
+        if self._queue:
+            self._start(*self._queue.popleft())
+            self.stats.queued = len(self._queue)
+        self.stats.in_flight = len(self._tasks)
+        self._wake_waiter()
+        if not self._tasks:
+            for waiter in self._drain_waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+            self._drain_waiters.clear()
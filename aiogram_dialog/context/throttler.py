@@ -0,0 +1,88 @@
+import asyncio
+from dataclasses import dataclass
+from logging import getLogger
+from typing import (
+    Awaitable, Callable, Dict, Hashable, Optional, Set,
+)
+
+logger = getLogger(__name__)
+
+UpdateSender = Callable[[Dict], Awaitable]
+
+
+@dataclass
+class _Window:
+    interval: float
+    send: UpdateSender
+    handle: asyncio.TimerHandle
+    data: Optional[Dict] = None
+
+
+class UpdateThrottler:
+    """
+    Limits background updates of the same dialog to one per interval.
+
+    Update is sent immediately if there was no update recently.
+    Otherwise, its data is merged with other updates received
+    till the end of the interval and sent once.
+    """
+
+    def __init__(self):
+        self._windows: Dict[Hashable, _Window] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def update(
+            self, key: Hashable, data: Dict, interval: float,
+            send: UpdateSender,
+    ) -> None:
+        window = self._windows.get(key)
+        if window is None:
+            self._open(key, interval, send)
+            await send(data)
+            return
+        if window.data is None:
+            window.data = {}
+        window.data.update(data)
+        window.send = send
+
+    async def flush(self, key: Optional[Hashable] = None) -> None:
+        """
+        Send merged updates now: of the key or all of them
+        """
+        if key is None:
+            keys = list(self._windows)
+        else:
+            keys = [key]
+        for key in keys:
+            window = self._windows.pop(key, None)
+            if window is None:
+                continue
+            window.handle.cancel()
+            if window.data is not None:
+                await window.send(window.data)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _open(self, key: Hashable, interval: float,
+              send: UpdateSender) -> None:
+        handle = asyncio.get_running_loop().call_later(
+            interval, self._send_pending, key,
+        )
+        self._windows[key] = _Window(
+            interval=interval, send=send, handle=handle,
+        )
+
+    def _send_pending(self, key: Hashable) -> None:
+        window = self._windows.pop(key)
+        if window.data is None:
+            return
+        # next updates are merged again till the end of new interval
+        self._open(key, window.interval, window.send)
+        task = asyncio.create_task(window.send(window.data))
+        self._tasks.add(task)
+        task.add_done_callback(self._update_done)
+
+    def _update_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Cannot send update", exc_info=task.exception())
@@ -137,6 +137,16 @@ class Dialog(ManagedDialogProto):
         logger.debug("Dialog show (%s)", self)
         window = await self._current_window(manager)
         new_message = await window.render(self, manager)
+        stack = manager.current_stack()
+        if (
+                new_message.render_key
+                and new_message.render_key == stack.last_render_key
+                and new_message.show_mode is ShowMode.EDIT
+                and stack.last_message_id
+        ):
+            # the same message is already shown
+            window.message_id = stack.last_message_id
+            return
         add_indent_id(new_message, manager.current_context().id)
         media_id_storage = manager.registry.media_id_storage
         if new_message.media and not new_message.media.file_id:
@@ -147,10 +157,10 @@ class Dialog(ManagedDialogProto):
             )
         if new_message.show_mode == ShowMode.SEND:
             await manager.process_window_removing()
-        stack = manager.current_stack()
         message = await manager.show(new_message)
         window.message_id = message.message_id
         stack.last_message_id = message.message_id
+        stack.last_render_key = new_message.render_key
         media_id = get_media_id(message)
         if media_id:
             stack.last_media_id = media_id.file_id
@@ -30,11 +30,31 @@ class DialogStackOverflow(DialogsError):
     pass
 
 
+class LockTimeoutError(DialogsError):
+    pass
+
+
+class LockReentryError(DialogsError):
+    pass
+
+
+class VersionConflictError(DialogsError):
+    pass
+
+
 # manager
 class IncorrectBackgroundError(DialogsError):
     pass
 
 
+class TaskPoolOverflowError(DialogsError):
+    pass
+
+
+class TaskPoolClosedError(DialogsError):
+    pass
+
+
 # navigation
 class UnregisteredDialogError(DialogsError):
     pass
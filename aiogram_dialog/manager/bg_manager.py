@@ -26,6 +26,7 @@ class BgManager(BaseDialogManager):
             intent_id: Optional[str],
             stack_id: Optional[str],
             load: bool = False,
+            throttle: float = 0,
     ):
         self.user = user
         self.chat = chat
@@ -34,6 +35,7 @@ class BgManager(BaseDialogManager):
         self.intent_id = intent_id
         self.stack_id = stack_id
         self.load = load
+        self.throttle = throttle
 
     @property
     def registry(self) -> DialogRegistryProto:
@@ -49,6 +51,7 @@ class BgManager(BaseDialogManager):
             chat_id: Optional[int] = None,
             stack_id: Optional[str] = None,
             load: bool = False,
+            throttle: float = 0,
     ) -> "BaseDialogManager":
         if chat_id in (None, self.chat.id):
             chat = self.chat
@@ -79,6 +82,7 @@ class BgManager(BaseDialogManager):
             intent_id=intent_id,
             stack_id=stack_id,
             load=load,
+            throttle=throttle,
         )
 
     def _base_event_params(self):
@@ -107,7 +111,14 @@ class BgManager(BaseDialogManager):
                 )
                 self.user = chat_member.user
 
+    def _throttle_key(self):
+        return self.chat.id, self.user.id, self.stack_id, self.intent_id
+
+    async def flush(self) -> None:
+        await self.registry.update_throttler.flush(self._throttle_key())
+
     async def done(self, result: Any = None) -> None:
+        await self.flush()
         await self._load()
         await self.registry.notify(DialogUpdateEvent(
             action=Action.DONE,
@@ -117,6 +128,7 @@ class BgManager(BaseDialogManager):
 
     async def start(self, state: State, data: Data = None,
                     mode: StartMode = StartMode.NORMAL) -> None:
+        await self.flush()
         await self._load()
         await self.registry.notify(DialogStartEvent(
             action=Action.START,
@@ -127,6 +139,7 @@ class BgManager(BaseDialogManager):
         ))
 
     async def switch_to(self, state: State) -> None:
+        await self.flush()
         await self._load()
         await self.registry.notify(DialogSwitchEvent(
             action=Action.SWITCH,
@@ -137,6 +150,14 @@ class BgManager(BaseDialogManager):
 
     async def update(self, data: Dict) -> None:
         await self._load()
+        if self.throttle:
+            await self.registry.update_throttler.update(
+                self._throttle_key(), data, self.throttle, self._send_update,
+            )
+        else:
+            await self._send_update(data)
+
+    async def _send_update(self, data: Dict) -> None:
         await self.registry.notify(DialogUpdateEvent(
             action=Action.UPDATE,
             data=data,
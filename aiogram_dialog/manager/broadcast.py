@@ -0,0 +1,92 @@
+import asyncio
+from dataclasses import dataclass
+from logging import getLogger
+from typing import (
+    AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, List,
+    Optional, Union,
+)
+
+logger = getLogger(__name__)
+
+DEFAULT_WORKERS = 10
+
+UserIds = Union[Iterable[int], AsyncIterable[int]]
+
+
+@dataclass
+class BroadcastResult:
+    user_id: int
+    error: Optional[Exception] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def _iter_user_ids(user_ids: UserIds) -> AsyncIterator[int]:
+    if isinstance(user_ids, AsyncIterable):
+        async for user_id in user_ids:
+            yield user_id
+    else:
+        for user_id in user_ids:
+            yield user_id
+
+
+async def broadcast(
+        user_ids: UserIds,
+        process: Callable[[int], Awaitable],
+        workers: int = DEFAULT_WORKERS,
+) -> AsyncIterator[BroadcastResult]:
+    """
+    Call `process` for each user using `workers` concurrent tasks.
+
+    User ids are read only when a worker is free and results are
+    yielded as soon as they are ready, so neither of them
+    is kept in memory. Stopping iteration cancels the rest.
+    """
+    if workers < 1:
+        raise ValueError("At least one worker is required")
+    pending: asyncio.Queue = asyncio.Queue(maxsize=workers)
+    results: asyncio.Queue = asyncio.Queue(maxsize=workers)
+    feed_error: List[Exception] = []
+
+    async def feed():
+        try:
+            async for user_id in _iter_user_ids(user_ids):
+                await pending.put(user_id)
+        except Exception as e:
+            # stop workers and raise it after they are finished
+            feed_error.append(e)
+        for _ in range(workers):
+            await pending.put(None)
+
+    async def work():
+        while True:
+            user_id = await pending.get()
+            if user_id is None:
+                break
+            try:
+                await process(user_id)
+            except Exception as e:
+                logger.debug("Broadcast failed for user %s", user_id)
+                await results.put(BroadcastResult(user_id, e))
+            else:
+                await results.put(BroadcastResult(user_id))
+        await results.put(None)
+
+    feeder = asyncio.create_task(feed())
+    tasks = [asyncio.create_task(work()) for _ in range(workers)]
+    try:
+        running = workers
+        while running:
+            result = await results.get()
+            if result is None:
+                running -= 1
+            else:
+                yield result
+        if feed_error:
+            raise feed_error[0]
+    finally:
+        for task in (feeder, *tasks):
+            task.cancel()
+        await asyncio.gather(feeder, *tasks, return_exceptions=True)
@@ -1,4 +1,4 @@
-from typing import Optional, Any
+from typing import Any, Dict, Optional
 
 from aiogram.dispatcher.filters.state import State
 
@@ -40,3 +40,7 @@ class ManagedDialogAdapter(ManagedDialogAdapterProto):
         if widget is None:
             return None
         return widget.managed(self.manager)
+
+    async def load_data(self) -> Dict:
+        window = await self.dialog._current_window(self.manager)  # noqa
+        return await window.load_data(self.dialog, self.manager)
@@ -1,8 +1,10 @@
+from functools import partial
 from logging import getLogger
 from typing import Any, Optional, Dict
 
 from aiogram.dispatcher.filters.state import State
 from aiogram.types import Message, CallbackQuery, Document
+from aiogram.utils.exceptions import MessageNotModified
 
 from .bg_manager import BgManager
 from .dialog import ManagedDialogAdapter
@@ -12,16 +14,29 @@ from .protocols import (
     NewMessage,
 )
 from ..context.context import Context
-from ..context.events import ChatEvent, StartMode, Data, FakeChat, FakeUser
+from ..context.events import (
+    ChatEvent, StartMode, Data, FakeChat, FakeUser, DialogUpdateEvent,
+)
+from ..context.getter_cache import has_cached_getters, user_scope
 from ..context.intent_filter import CONTEXT_KEY, STORAGE_KEY, STACK_KEY
+from ..context.scheduler import Priority, ScheduledBot
 from ..context.stack import Stack, DEFAULT_STACK_ID
 from ..context.storage import StorageProxy
 from ..exceptions import IncorrectBackgroundError
-from ..utils import get_chat, remove_kbd, show_message, remove_message
+from ..utils import (
+    get_chat, remove_kbd, show_message, remove_message, edit_message,
+)
 
 logger = getLogger(__name__)
 
 
+async def edit_postponed(bot, new_message: NewMessage, old_message: Message):
+    try:
+        await edit_message(bot, new_message, old_message)
+    except MessageNotModified:
+        pass
+
+
 class ManagerImpl(DialogManager):
     def __init__(self, event: ChatEvent, registry: DialogRegistryProto,
                  data: Dict):
@@ -69,12 +84,27 @@ class ManagerImpl(DialogManager):
     def storage(self) -> StorageProxy:
         return self.data[STORAGE_KEY]
 
+    def _bot(self):
+        """
+        Bot to send messages, through scheduler if it is configured
+        """
+        scheduler = self.registry.scheduler
+        if scheduler is None:
+            return self.event.bot
+        if isinstance(self.event, DialogUpdateEvent):
+            priority = Priority.BACKGROUND
+        else:
+            priority = Priority.INTERACTIVE
+        return ScheduledBot(self.event.bot, scheduler, priority)
+
     async def _remove_kbd(self) -> None:
         chat = get_chat(self.event)
         message = Message(chat=chat,
                           message_id=self.current_stack().last_message_id)
+        # before anything is awaited, so the edit is not sent meanwhile
+        self._cancel_postponed_edit(message)
         await self.process_window_removing()
-        await remove_kbd(self.event.bot, message)
+        await remove_kbd(self._bot(), message)
         self.current_stack().last_message_id = None
 
     async def done(self, result: Any = None) -> None:
@@ -196,12 +226,45 @@ class ManagerImpl(DialogManager):
                 old_message = None
         if new_message.show_mode is ShowMode.AUTO:
             new_message.show_mode = self._calc_show_mode()
-        res = await show_message(self.event.bot, new_message, old_message)
+        bot = self._bot()
+        if old_message and self._postpone_edit(bot, new_message, old_message):
+            self.show_mode = ShowMode.EDIT
+            return old_message
+        res = await show_message(bot, new_message, old_message)
         if isinstance(self.event, Message):
             stack.last_income_media_group_id = self.event.media_group_id
         self.show_mode = ShowMode.EDIT
         return res
 
+    def _postpone_edit(self, bot, new_message: NewMessage,
+                       old_message: Message) -> bool:
+        """
+        Leave edit of a message from background to `EditCoalescer`.
+
+        Only text is edited this way, so the message stays the same.
+        Other changes of the message drop postponed edit.
+        """
+        coalescer = self.registry.edit_coalescer
+        if coalescer is None:
+            return False
+        key = (old_message.chat.id, old_message.message_id)
+        if (
+                isinstance(self.event, DialogUpdateEvent)
+                and new_message.show_mode is ShowMode.EDIT
+                and not new_message.media
+                and not self.current_stack().last_media_id
+        ):
+            return coalescer.postpone(
+                key, partial(edit_postponed, bot, new_message, old_message),
+            )
+        coalescer.cancel(key)
+        return False
+
+    def _cancel_postponed_edit(self, message: Message) -> None:
+        coalescer = self.registry.edit_coalescer
+        if coalescer is not None:
+            coalescer.cancel((message.chat.id, message.message_id))
+
     def _calc_show_mode(self) -> ShowMode:
         if self.show_mode is not ShowMode.AUTO:
             return self.show_mode
@@ -222,6 +285,10 @@ class ManagerImpl(DialogManager):
 
     async def update(self, data: Dict) -> None:
         self.current_context().dialog_data.update(data)
+        if has_cached_getters():
+            await self.registry.getter_cache.invalidate(user_scope(
+                get_chat(self.event).id, self.event.from_user.id,
+            ))
         await self._dialog().show(self)
 
     def bg(
@@ -230,6 +297,7 @@ class ManagerImpl(DialogManager):
             chat_id: Optional[int] = None,
             stack_id: Optional[str] = None,
             load: bool = False,
+            throttle: float = 0,
     ) -> "BaseDialogManager":
         current_chat = get_chat(self.event)
         current_user = self.event.from_user
@@ -260,6 +328,7 @@ class ManagerImpl(DialogManager):
             intent_id=intent_id,
             stack_id=stack_id,
             load=load,
+            throttle=throttle,
         )
 
     async def close_manager(self) -> None:
@@ -280,4 +349,5 @@ class ManagerImpl(DialogManager):
 
         window_message = Message(message_id=_window.message_id,
                                  chat=get_chat(self.event))
-        return await remove_message(self.event.bot, window_message)
+        self._cancel_postponed_edit(window_message)
+        return await remove_message(self._bot(), window_message)
@@ -10,7 +10,11 @@ from aiogram.types import (
 
 from ..context.context import Context
 from ..context.events import DialogUpdateEvent, StartMode, ChatEvent, Data
+from ..context.coalescer import EditCoalescer
+from ..context.scheduler import RequestScheduler
 from ..context.stack import Stack
+from ..context.task_pool import TaskPool
+from ..context.throttler import UpdateThrottler
 
 
 class ShowMode(Enum):
@@ -58,6 +62,11 @@ class ManagedDialogAdapterProto:
     def find(self, widget_id) -> Optional[Any]:
         pass
 
+    async def load_data(self) -> Dict:
+        """
+        Load data of current window by its getter
+        """
+
 
 class ManagedDialogProto(Protocol):
     launch_mode: LaunchMode
@@ -135,6 +144,23 @@ class MediaIdStorageProtocol(Protocol):
         raise NotImplementedError
 
 
+class GetterCacheProtocol(Protocol):
+    """
+    Storage for data of cached getters.
+
+    Data is grouped by `scope` to be invalidated at once
+    """
+
+    async def get(self, scope: str, key: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    async def set(self, scope: str, key: str, data: Dict, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def invalidate(self, scope: str) -> None:
+        raise NotImplementedError
+
+
 class MediaAttachment:
     def __init__(
             self,
@@ -162,6 +188,7 @@ class NewMessage:
     show_mode: ShowMode = ShowMode.AUTO
     disable_web_page_preview: Optional[bool] = None
     media: Optional[MediaAttachment] = None
+    render_key: Optional[str] = None  # see `Window.render_cache_size`
 
 
 class DialogRegistryProto(Protocol):
@@ -175,6 +202,26 @@ class DialogRegistryProto(Protocol):
     def media_id_storage(self) -> MediaIdStorageProtocol:
         raise NotImplementedError
 
+    @property
+    def getter_cache(self) -> GetterCacheProtocol:
+        raise NotImplementedError
+
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        raise NotImplementedError
+
+    @property
+    def edit_coalescer(self) -> Optional[EditCoalescer]:
+        raise NotImplementedError
+
+    @property
+    def update_throttler(self) -> UpdateThrottler:
+        raise NotImplementedError
+
+    @property
+    def task_pool(self) -> TaskPool:
+        raise NotImplementedError
+
 
 class BaseDialogManager(Protocol):
     event: ChatEvent
@@ -209,12 +256,19 @@ class BaseDialogManager(Protocol):
     async def update(self, data: Dict) -> None:
         pass
 
+    async def flush(self) -> None:
+        """
+        Send throttled updates now
+        """
+        pass
+
     def bg(
             self,
             user_id: Optional[int] = None,
             chat_id: Optional[int] = None,
             stack_id: Optional[str] = None,
             load: bool = False,  # load chat and user
+            throttle: float = 0,  # min interval of updates in seconds
     ) -> "BaseDialogManager":
         pass
 
@@ -1,22 +1,43 @@
 import asyncio
-from contextvars import copy_context
-from typing import Sequence, Type, Dict, Optional
+from logging import getLogger
+from typing import AsyncIterator, Sequence, Type, Dict, Optional
 
 from aiogram import Dispatcher, Bot
 from aiogram.dispatcher.filters.state import State, StatesGroup
 from aiogram.dispatcher.handler import Handler
 from aiogram.types import User, Chat, Message
 
+from .broadcast import (
+    DEFAULT_WORKERS, BroadcastResult, UserIds, broadcast,
+)
 from .manager_middleware import ManagerMiddleware
 from .protocols import (
     ManagedDialogProto, DialogRegistryProto, DialogManager,
-    MediaIdStorageProtocol,
+    MediaIdStorageProtocol, GetterCacheProtocol,
 )
 from .update_handler import handle_update
-from ..context.events import DialogUpdateEvent, StartMode
+from ..context.dialog_storage import DialogStorage, FSMDialogStorage
+from ..context.events import (
+    Action, Data, DialogStartEvent, DialogUpdateEvent, FakeChat, FakeUser,
+    StartMode,
+)
+from ..context.getter_cache import MemoryGetterCache
 from ..context.intent_filter import IntentFilter, IntentMiddleware
+from ..context.locks import (
+    LockManager, MemoryLockManager, held_locks, stack_lock_key,
+)
+from ..context.storage import StateIndex
 from ..context.media_storage import MediaIdStorage
-from ..exceptions import UnregisteredDialogError
+from ..context.coalescer import EditCoalescer
+from ..context.scheduler import RequestScheduler
+from ..context.stack import DEFAULT_STACK_ID
+from ..context.task_pool import TaskPool
+from ..context.throttler import UpdateThrottler
+from ..exceptions import LockReentryError, UnregisteredDialogError
+from ..widgets.text.jinja import Jinja, get_jinja_env
+from ..widgets.utils import iter_widgets
+
+logger = getLogger(__name__)
 
 
 class DialogRegistry(DialogRegistryProto):
@@ -25,6 +46,13 @@ class DialogRegistry(DialogRegistryProto):
             dp: Dispatcher,
             dialogs: Sequence[ManagedDialogProto] = (),
             media_id_storage: Optional[MediaIdStorageProtocol] = None,
+            dialog_storage: Optional[DialogStorage] = None,
+            lock_manager: Optional[LockManager] = None,
+            check_versions: bool = False,
+            getter_cache: Optional[GetterCacheProtocol] = None,
+            scheduler: Optional[RequestScheduler] = None,
+            edit_coalescer: Optional[EditCoalescer] = None,
+            task_pool: Optional[TaskPool] = None,
     ):
         self.dp = dp
         self.dialogs = {
@@ -33,24 +61,63 @@ class DialogRegistry(DialogRegistryProto):
         self.state_groups: Dict[str, Type[StatesGroup]] = {
             d.states_group_name(): d.states_group() for d in dialogs
         }
+        self.state_index = StateIndex(self.state_groups.values())
         self.update_handler = Handler(dp, middleware_key="aiogd_update")
         self.register_update_handler(handle_update, state="*")
         self.dp.filters_factory.bind(IntentFilter)
+        if dialog_storage is None:
+            dialog_storage = FSMDialogStorage(dp.storage)
+        self.dialog_storage = dialog_storage
+        if lock_manager is None and not check_versions:
+            lock_manager = MemoryLockManager()
+        self.lock_manager = lock_manager
+        self.check_versions = check_versions
+        self._sweeper: Optional[asyncio.Task] = None
         self._register_middleware()
         if media_id_storage is None:
             media_id_storage = MediaIdStorage()
         self._media_id_storage = media_id_storage
+        if getter_cache is None:
+            getter_cache = MemoryGetterCache()
+        self._getter_cache = getter_cache
+        self._scheduler = scheduler
+        self._edit_coalescer = edit_coalescer
+        self._update_throttler = UpdateThrottler()
+        if task_pool is None:
+            task_pool = TaskPool()
+        self._task_pool = task_pool
 
     @property
     def media_id_storage(self) -> MediaIdStorageProtocol:
         return self._media_id_storage
 
+    @property
+    def getter_cache(self) -> GetterCacheProtocol:
+        return self._getter_cache
+
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        return self._scheduler
+
+    @property
+    def edit_coalescer(self) -> Optional[EditCoalescer]:
+        return self._edit_coalescer
+
+    @property
+    def update_throttler(self) -> UpdateThrottler:
+        return self._update_throttler
+
+    @property
+    def task_pool(self) -> TaskPool:
+        return self._task_pool
+
     def register(self, dialog: ManagedDialogProto, *args, **kwargs):
         group = dialog.states_group()
         if group in self.dialogs:
             raise ValueError(f"StatesGroup `{group}` is already used")
         self.dialogs[group] = dialog
         self.state_groups[dialog.states_group_name()] = group
+        self.state_index.add_group(group)
         dialog.register(
             self,
             self.dp,
@@ -69,7 +136,12 @@ class DialogRegistry(DialogRegistryProto):
             ManagerMiddleware(self)
         )
         self.dp.setup_middleware(
-            IntentMiddleware(storage=self.dp.storage, state_groups=self.state_groups)
+            IntentMiddleware(
+                storage=self.dialog_storage,
+                state_index=self.state_index,
+                lock_manager=self.lock_manager,
+                check_versions=self.check_versions,
+            )
         )
 
     def find_dialog(self, state: State) -> ManagedDialogProto:
@@ -89,16 +161,181 @@ class DialogRegistry(DialogRegistryProto):
             self.dp._wrap_async_task(callback, run_task), filters_set
         )
 
-    async def notify(self, event: DialogUpdateEvent) -> None:
-        callback = lambda: asyncio.create_task(self._process_update(event))
+    def precompile_templates(self, bot: Optional[Bot] = None) -> int:
+        """
+        Compile jinja templates of all registered dialogs,
+        so they are not compiled while processing first updates.
+
+        Call it after `setup_jinja`, returns number of templates
+        """
+        if bot is None:
+            bot = self.dp.bot
+        env = get_jinja_env(bot)
+        windows = [
+            window
+            for dialog in self.dialogs.values()
+            for window in getattr(dialog, "windows", {}).values()
+        ]
+        compiled = 0
+        for widget in iter_widgets(*windows):
+            if isinstance(widget, Jinja):
+                widget.get_template(env)
+                compiled += 1
+        return compiled
 
-        asyncio.get_running_loop().call_soon(
-            callback,
-            context=copy_context()
+    async def sweep(self, batch_size: int = 1000) -> int:
+        """
+        Remove expired dialogs from storage, returns number of removed records.
+
+        Only storages with `ttl` have records to remove here:
+        `MemoryDialogStorage` or `FSMDialogStorage`, which is used
+        by default without `ttl`, so its dialogs are never expired
+        """
+        removed = 0
+        while True:
+            purged = await self.dialog_storage.purge_expired(batch_size)
+            removed += purged
+            if purged < batch_size:
+                break
+            await asyncio.sleep(0)  # let updates be processed between batches
+        if removed:
+            logger.info("Removed %s expired dialog records", removed)
+        return removed
+
+    def start_sweeper(self, interval: float = 60,
+                      batch_size: int = 1000) -> asyncio.Task:
+        """
+        Start background task calling `sweep` each `interval` seconds.
+
+        It is stopped by `close`
+        """
+        if self._sweeper:
+            raise ValueError("Sweeper is already started")
+        self._sweeper = asyncio.create_task(
+            self._run_sweeper(interval, batch_size),
+        )
+        return self._sweeper
+
+    async def _run_sweeper(self, interval: float, batch_size: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep(batch_size)
+            except Exception:
+                logger.exception("Cannot remove expired dialogs")
+
+    async def close(self, timeout: Optional[float] = None) -> None:
+        """
+        Call it on shutdown to save pending dialog changes
+        and send postponed updates and edits.
+
+        Waits for dialog updates being processed up to `timeout` seconds
+        """
+        await self._update_throttler.flush()
+        try:
+            await self._task_pool.drain(timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Dialog updates are not processed in %s seconds, "
+                "%s are in progress, %s are queued",
+                timeout, self._task_pool.stats.in_flight,
+                self._task_pool.stats.queued,
+            )
+        if self._sweeper:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        if self._edit_coalescer:
+            await self._edit_coalescer.flush()
+        await self.dialog_storage.close()
+
+    def broadcast_start(
+            self,
+            state: State,
+            user_ids: UserIds,
+            data: Data = None,
+            mode: StartMode = StartMode.NORMAL,
+            stack_id: str = DEFAULT_STACK_ID,
+            workers: int = DEFAULT_WORKERS,
+            bot: Optional[Bot] = None,
+    ) -> AsyncIterator[BroadcastResult]:
+        """
+        Start dialog in private chats of users.
+
+        At most `workers` users are processed at a time. Iterate over
+        the result to run it and get status of each user when it is done
+        """
+
+        def make_event(user_id: int) -> DialogUpdateEvent:
+            return DialogStartEvent(
+                action=Action.START,
+                data=data,
+                new_state=state,
+                mode=mode,
+                **self._broadcast_event_params(user_id, stack_id, bot),
+            )
+
+        return self._broadcast(user_ids, make_event, workers)
+
+    def broadcast_update(
+            self,
+            user_ids: UserIds,
+            data: Dict,
+            stack_id: str = DEFAULT_STACK_ID,
+            workers: int = DEFAULT_WORKERS,
+            bot: Optional[Bot] = None,
+    ) -> AsyncIterator[BroadcastResult]:
+        """
+        Update current dialogs in private chats of users.
+
+        Works like `broadcast_start`
+        """
+
+        def make_event(user_id: int) -> DialogUpdateEvent:
+            return DialogUpdateEvent(
+                action=Action.UPDATE,
+                data=data,
+                **self._broadcast_event_params(user_id, stack_id, bot),
+            )
+
+        return self._broadcast(user_ids, make_event, workers)
+
+    def _broadcast_event_params(self, user_id: int, stack_id: str,
+                                bot: Optional[Bot]) -> Dict:
+        return {
+            "bot": bot or self.dp.bot,
+            "from_user": FakeUser(id=user_id),
+            "chat": FakeChat(id=user_id),
+            "intent_id": None,
+            "stack_id": stack_id,
+        }
+
+    def _broadcast(self, user_ids: UserIds, make_event, workers: int):
+        async def process(user_id: int) -> None:
+            event = make_event(user_id)
+            key = stack_lock_key(user_id, user_id, event.stack_id)
+            if key in held_locks.get():
+                # the handler broadcasting waits for it, so it would hang
+                raise LockReentryError(
+                    f"Lock for `{key}` is held by the update broadcasting",
+                )
+            await self._process_update(event)
+
+        return broadcast(user_ids, process, workers)
+
+    async def notify(self, event: DialogUpdateEvent) -> None:
+        # running jobs can wait for the lock held by submitting handler
+        await self._task_pool.submit(
+            lambda: self._process_update(event), wait=not held_locks.get(),
         )
 
     async def _process_update(self, event: DialogUpdateEvent):
         Bot.set_current(event.bot)
         User.set_current(event.from_user)
         Chat.set_current(event.chat)
-        await self.update_handler.notify(event)
+        # locks of the update which started this one are not held here
+        token = held_locks.set(frozenset())
+        try:
+            await self.update_handler.notify(event)
+        finally:
+            held_locks.reset(token)
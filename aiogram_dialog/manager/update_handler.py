@@ -16,9 +16,6 @@ async def handle_update(event: DialogUpdateEvent, dialog_manager: ManagerImpl):
         if not dialog_manager.current_context():
             logger.warning("No context found")
             return
-        if event.data:
-            for k, v in event.data.items():
-                dialog_manager.current_context().dialog_data[k] = v
-        await dialog_manager.dialog().show()
+        await dialog_manager.update(event.data or {})
     elif event.action is Action.DONE:
         await dialog_manager.done(result=event.data)
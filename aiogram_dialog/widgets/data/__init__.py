@@ -1,10 +1,19 @@
 from .data_context import (
     DataGetter, CompositeGetter, StaticGetter, PreviewAwareGetter,
+    ParallelGetter, GetterSpec, CachedGetter, cached_getter,
 )
+from .items_source import ItemsSource, SequenceSource, AsyncIteratorSource
 
 __all__ = [
     "DataGetter",
     "CompositeGetter",
     "StaticGetter",
     "PreviewAwareGetter",
+    "ParallelGetter",
+    "GetterSpec",
+    "CachedGetter",
+    "cached_getter",
+    "ItemsSource",
+    "SequenceSource",
+    "AsyncIteratorSource",
 ]
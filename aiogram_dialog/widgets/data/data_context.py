@@ -1,6 +1,14 @@
-from typing import Dict, Awaitable, Callable, List
+import asyncio
+from dataclasses import dataclass
+from typing import (
+    Dict, Awaitable, Callable, Hashable, List, Optional, Sequence, Union,
+)
 
+from aiogram_dialog.context.getter_cache import (
+    cached_getter_created, user_scope,
+)
 from aiogram_dialog.manager.protocols import DialogManager
+from aiogram_dialog.utils import get_chat
 
 DataGetter = Callable[..., Awaitable[Dict]]
 
@@ -16,6 +24,99 @@ class CompositeGetter:
         return data
 
 
+@dataclass
+class GetterSpec:
+    """
+    Getter options for `ParallelGetter`.
+
+    Getter is started after getters named in `depends_on` and receives
+    their data as keyword arguments. If it or any of its dependencies
+    fails or it does not finish in `timeout` seconds,
+    `fallback` data is used if it is set.
+    """
+    getter: DataGetter
+    name: Optional[str] = None
+    depends_on: Sequence[str] = ()
+    timeout: Optional[float] = None
+    fallback: Optional[Dict] = None
+
+
+class ParallelGetter:
+    """
+    Runs getters concurrently and merges their data in the order of
+    getters, so later ones override keys of previous independently
+    of which getter finished first
+    """
+
+    def __init__(self, *getters: Union[DataGetter, GetterSpec]):
+        self.specs: List[GetterSpec] = [
+            g if isinstance(g, GetterSpec) else GetterSpec(g)
+            for g in getters
+        ]
+        self.names: Dict[str, int] = {}
+        for i, spec in enumerate(self.specs):
+            if spec.name is None:
+                continue
+            if spec.name in self.names:
+                raise ValueError(f"Getter name `{spec.name}` is used twice")
+            self.names[spec.name] = i
+        self.order = self._sort_dependencies()
+
+    def _sort_dependencies(self) -> List[int]:
+        order: List[int] = []
+
+        def visit(i: int, path: List[int]):
+            if i in path:
+                raise ValueError(f"Getters have circular dependency: "
+                                 f"{[self.specs[j].name for j in path]}")
+            if i in order:
+                return
+            for name in self.specs[i].depends_on:
+                if name not in self.names:
+                    raise ValueError(f"Unknown getter `{name}` in dependencies")
+                visit(self.names[name], path + [i])
+            order.append(i)
+
+        for i in range(len(self.specs)):
+            visit(i, [])
+        return order
+
+    async def __call__(self, **kwargs):
+        # dependencies are started first, so their tasks can be awaited
+        tasks: Dict[int, asyncio.Task] = {}
+        for i in self.order:
+            tasks[i] = asyncio.ensure_future(
+                self._run(self.specs[i], tasks, kwargs),
+            )
+        try:
+            results = await asyncio.gather(
+                *(tasks[i] for i in range(len(self.specs)))
+            )
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        data = {}
+        for result in results:
+            data.update(result)
+        return data
+
+    async def _run(self, spec: GetterSpec, tasks: Dict[int, asyncio.Task],
+                   kwargs: Dict) -> Dict:
+        try:
+            if spec.depends_on:
+                kwargs = dict(kwargs)
+                for name in spec.depends_on:
+                    kwargs.update(
+                        await asyncio.shield(tasks[self.names[name]]),
+                    )
+            return await asyncio.wait_for(spec.getter(**kwargs), spec.timeout)
+        except Exception:
+            if spec.fallback is None:
+                raise
+            return spec.fallback
+
+
 class StaticGetter:
     def __init__(self, data: Dict):
         self.data = data
@@ -24,6 +125,72 @@ class StaticGetter:
         return self.data
 
 
+def _getter_name(getter: DataGetter) -> str:
+    qualname = getattr(getter, "__qualname__", None)
+    if not qualname or "<lambda>" in qualname or "<locals>" in qualname:
+        raise ValueError(
+            f"Cannot make unique cache name for getter {getter!r}, "
+            f"pass `name` explicitly",
+        )
+    return f"{getter.__module__}.{qualname}"
+
+
+class CachedGetter:
+    """
+    Keeps getter data for each user and window during `ttl` seconds.
+
+    `key` receives getter arguments and returns additional part
+    of cache key if data depends on something else.
+    `name` identifies the getter in cache, by default it is its
+    qualified name, so it must be passed for lambdas and nested functions.
+    Cache of a user is dropped by `DialogManager.update`
+    and `BgManager.update`.
+    """
+
+    def __init__(self, getter: DataGetter, ttl: float = 60,
+                 key: Optional[Callable[..., Hashable]] = None,
+                 name: Optional[str] = None):
+        self.getter = getter
+        self.ttl = ttl
+        self.key = key
+        if name is None:
+            name = _getter_name(getter)
+        self.name = name
+        cached_getter_created()
+
+    async def __call__(self, dialog_manager: DialogManager, **kwargs):
+        if dialog_manager.is_preview():
+            return await self.getter(dialog_manager=dialog_manager, **kwargs)
+
+        cache = dialog_manager.registry.getter_cache
+        scope = user_scope(
+            get_chat(dialog_manager.event).id,
+            dialog_manager.event.from_user.id,
+        )
+        key = f"{dialog_manager.current_context().state.state}:{self.name}"
+        if self.key:
+            key += f":{self.key(dialog_manager=dialog_manager, **kwargs)}"
+
+        data = await cache.get(scope, key)
+        if data is None:
+            data = await self.getter(dialog_manager=dialog_manager, **kwargs)
+            await cache.set(scope, key, data, self.ttl)
+        return data
+
+
+def cached_getter(ttl: float = 60,
+                  key: Optional[Callable[..., Hashable]] = None,
+                  name: Optional[str] = None):
+    """
+    Decorator creating `CachedGetter`
+    """
+
+    def decorator(getter: DataGetter) -> CachedGetter:
+        return CachedGetter(getter, ttl=ttl, key=key, name=name)
+
+    return decorator
+
+
 class PreviewAwareGetter:
     def __init__(self, normal_getter: DataGetter, preview_getter: DataGetter):
         self.normal_getter = normal_getter
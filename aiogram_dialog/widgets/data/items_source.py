@@ -0,0 +1,132 @@
+from abc import ABC, abstractmethod
+from typing import (
+    Any, AsyncIterable, Callable, Dict, List, Optional, Sequence, Union,
+)
+
+ItemIdGetter = Callable[[Any], Union[str, int]]
+
+
+class ItemsSource(ABC):
+    """
+    Items of `Select`, `ListGroup` or `List` loaded on demand.
+
+    Return it from getter instead of a sequence,
+    so `ScrollingGroup` loads only items of the current page
+    """
+
+    @abstractmethod
+    async def count(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def slice(self, offset: int, limit: int) -> Sequence:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get(self, item_id: str) -> Optional[Any]:
+        """
+        Find item by id as it is used in callback data
+        """
+        raise NotImplementedError
+
+
+Items = Union[Sequence, ItemsSource]
+
+
+class SequenceSource(ItemsSource):
+    def __init__(self, items: Sequence, item_id_getter: ItemIdGetter):
+        self.items = items
+        self.item_id_getter = item_id_getter
+        self._by_id: Optional[Dict[str, Any]] = None
+
+    async def count(self) -> int:
+        return len(self.items)
+
+    async def slice(self, offset: int, limit: int) -> Sequence:
+        return self.items[offset:offset + limit]
+
+    async def get(self, item_id: str) -> Optional[Any]:
+        if self._by_id is None:
+            self._by_id = {
+                str(self.item_id_getter(item)): item for item in self.items
+            }
+        return self._by_id.get(item_id)
+
+
+class AsyncIteratorSource(ItemsSource):
+    """
+    Items produced by async iterator, e.g. async generator.
+
+    Items are read only as far as requested and kept, so the source
+    is created for each render. Pass `count` if it is known,
+    otherwise counting reads all items
+    """
+
+    def __init__(self, items: AsyncIterable, item_id_getter: ItemIdGetter,
+                 count: Optional[int] = None):
+        self.item_id_getter = item_id_getter
+        self._iterator = items.__aiter__()
+        self._loaded: List[Any] = []
+        self._count = count
+        self._exhausted = False
+
+    async def _load_next(self) -> bool:
+        if self._exhausted:
+            return False
+        try:
+            self._loaded.append(await self._iterator.__anext__())
+        except StopAsyncIteration:
+            self._exhausted = True
+            return False
+        return True
+
+    async def count(self) -> int:
+        if self._count is None:
+            while await self._load_next():
+                pass
+            self._count = len(self._loaded)
+        return self._count
+
+    async def slice(self, offset: int, limit: int) -> Sequence:
+        while len(self._loaded) < offset + limit:
+            if not await self._load_next():
+                break
+        return self._loaded[offset:offset + limit]
+
+    async def get(self, item_id: str) -> Optional[Any]:
+        for item in self._loaded:
+            if str(self.item_id_getter(item)) == item_id:
+                return item
+        while await self._load_next():
+            item = self._loaded[-1]
+            if str(self.item_id_getter(item)) == item_id:
+                return item
+        return None
+
+
+async def count_items(items: Items) -> int:
+    if isinstance(items, ItemsSource):
+        return await items.count()
+    return len(items)
+
+
+async def slice_items(items: Items, offset: int, limit: int) -> Sequence:
+    if isinstance(items, ItemsSource):
+        return await items.slice(offset, limit)
+    return items[offset:offset + limit]
+
+
+async def load_items(items: Items) -> Sequence:
+    if isinstance(items, ItemsSource):
+        return await items.slice(0, await items.count())
+    return items
+
+
+async def get_item(items: Items, item_id: str,
+                   item_id_getter: ItemIdGetter) -> Optional[Any]:
+    if isinstance(items, ItemsSource):
+        return await items.get(item_id)
+    for item in items:
+        if str(item_id_getter(item)) == item_id:
+            return item
+    return None
@@ -23,3 +23,39 @@ class Keyboard(Actionable, Whenable):
 
     async def process_callback(self, c: CallbackQuery, dialog: Dialog, manager: DialogManager) -> bool:
         return False
+
+
+class PagedKeyboard(Keyboard):
+    """
+    Keyboard which can render a range of its buttons without others.
+
+    Buttons are counted as if all rows are joined into one,
+    so `ScrollingGroup` with `width` renders only its current page
+    """
+
+    def loads_on_demand(self, data) -> bool:
+        """
+        Whether buttons are built from `ItemsSource`,
+        which should not be loaded entirely
+        """
+        return False
+
+    async def get_buttons_count(self, data, manager: DialogManager) -> int:
+        if not self.is_(data, manager):
+            return 0
+        return await self._get_buttons_count(data, manager)
+
+    async def _get_buttons_count(self, data, manager: DialogManager) -> int:
+        raise NotImplementedError
+
+    async def render_buttons(
+            self, data, manager: DialogManager, offset: int, limit: int,
+    ) -> List[InlineKeyboardButton]:
+        if not self.is_(data, manager):
+            return []
+        return await self._render_buttons(data, manager, offset, limit)
+
+    async def _render_buttons(
+            self, data, manager: DialogManager, offset: int, limit: int,
+    ) -> List[InlineKeyboardButton]:
+        raise NotImplementedError
@@ -1,3 +1,4 @@
+import asyncio
 from itertools import chain
 from typing import List, Dict, Optional
 
@@ -11,10 +12,12 @@ from ..when import WhenCondition
 
 class Group(Keyboard):
     def __init__(self, *buttons: Keyboard, id: Optional[str] = None, width: int = None,
-                 when: WhenCondition = None):
+                 when: WhenCondition = None, concurrent: bool = False):
         super().__init__(id, when)
         self.buttons = buttons
         self.width = width
+        # rendering in separate tasks is slower unless buttons wait for I/O
+        self.concurrent = concurrent
 
     def find(self, widget_id):
         widget = super(Group, self).find(widget_id)
@@ -27,9 +30,14 @@ class Group(Keyboard):
         return None
 
     async def _render_keyboard(self, data: Dict, manager: DialogManager) -> List[List[InlineKeyboardButton]]:
+        if self.concurrent:
+            kbds = await asyncio.gather(*(
+                b.render_keyboard(data, manager) for b in self.buttons
+            ))
+        else:
+            kbds = [await b.render_keyboard(data, manager) for b in self.buttons]
         kbd: List[List[InlineKeyboardButton]] = []
-        for b in self.buttons:
-            b_kbd = await b.render_keyboard(data, manager)
+        for b_kbd in kbds:
             if self.width is None or not kbd:
                 kbd += b_kbd
             else:
@@ -58,10 +66,13 @@ class Group(Keyboard):
 
 
 class Row(Group):
-    def __init__(self, *buttons: Keyboard, id: Optional[str] = None, when: WhenCondition = None):
-        super().__init__(*buttons, id=id, width=9999, when=when)  # telegram doe not allow even 100 columns
+    def __init__(self, *buttons: Keyboard, id: Optional[str] = None, when: WhenCondition = None,
+                 concurrent: bool = False):
+        super().__init__(*buttons, id=id, width=9999, when=when,
+                         concurrent=concurrent)  # telegram doe not allow even 100 columns
 
 
 class Column(Group):
-    def __init__(self, *buttons: Keyboard, id: Optional[str] = None, when: WhenCondition = None):
-        super().__init__(*buttons, id=id, when=when, width=1)
+    def __init__(self, *buttons: Keyboard, id: Optional[str] = None, when: WhenCondition = None,
+                 concurrent: bool = False):
+        super().__init__(*buttons, id=id, when=when, width=1, concurrent=concurrent)
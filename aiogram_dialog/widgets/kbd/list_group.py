@@ -9,6 +9,7 @@ from aiogram_dialog.manager.protocols import (
     DialogManager, Context, ManagedDialogAdapterProto, NewMessage,
 )
 from .base import Keyboard
+from ..data.items_source import Items, ItemsSource, load_items
 from ..managed import ManagedWidgetAdapter
 from ..when import WhenCondition
 from ...context.stack import Stack
@@ -53,12 +54,12 @@ class SubManager(DialogManager):
         return getattr(self.manager, item)
 
 
-ItemsGetter = Callable[[Dict], Sequence]
+ItemsGetter = Callable[[Dict], Items]
 ItemIdGetter = Callable[[Any], Union[str, int]]
 
 
-def get_identity(items: Sequence) -> ItemsGetter:
-    def identity(data) -> Sequence:
+def get_identity(items: Items) -> ItemsGetter:
+    def identity(data) -> Items:
         return items
 
     return identity
@@ -69,7 +70,7 @@ class ListGroup(Keyboard):
             self, *buttons: Keyboard,
             id: Optional[str] = None,
             item_id_getter: ItemIdGetter,
-            items: Union[str, Sequence],
+            items: Union[str, Sequence, ItemsSource],
             when: WhenCondition = None,
     ):
         super().__init__(id, when)
@@ -84,7 +85,8 @@ class ListGroup(Keyboard):
             self, data: Dict, manager: DialogManager
     ) -> List[List[InlineKeyboardButton]]:
         kbd: List[List[InlineKeyboardButton]] = []
-        for pos, item in enumerate(self.items_getter(data)):
+        items = await load_items(self.items_getter(data))
+        for pos, item in enumerate(items):
             kbd.extend(await self._render_item(pos, item, data, manager))
         return kbd
 
@@ -1,3 +1,5 @@
+import asyncio
+from itertools import chain
 from typing import List, Dict, Optional, Callable, Awaitable, Union
 
 from aiogram.types import InlineKeyboardButton, CallbackQuery
@@ -6,7 +8,7 @@ from aiogram_dialog.deprecation_utils import manager_deprecated
 from aiogram_dialog.dialog import Dialog, ChatEvent
 from aiogram_dialog.manager.protocols import DialogManager
 from aiogram_dialog.widgets.widget_event import WidgetEventProcessor, ensure_event_processor
-from .base import Keyboard
+from .base import Keyboard, PagedKeyboard
 from .group import Group
 from ..managed import ManagedWidgetAdapter
 from ..when import WhenCondition
@@ -20,28 +22,98 @@ OnStateChanged = Callable[
 class ScrollingGroup(Group):
     def __init__(self, *buttons: Keyboard, id: str, width: Optional[int] = None,
                  height: int = 0, when: WhenCondition = None,
-                 on_page_changed: Union[OnStateChanged, WidgetEventProcessor, None] = None):
-        super().__init__(*buttons, id=id, width=width, when=when)
+                 on_page_changed: Union[OnStateChanged, WidgetEventProcessor, None] = None,
+                 concurrent: bool = False):
+        super().__init__(*buttons, id=id, width=width, when=when,
+                         concurrent=concurrent)
         self.height = height
         self.on_page_changed = ensure_event_processor(on_page_changed)
 
     async def _render_keyboard(self, data: Dict, manager: DialogManager) -> List[List[InlineKeyboardButton]]:
+        if self.width:
+            return await self._render_page(data, manager)
+        for button in self.buttons:
+            paged = isinstance(button, PagedKeyboard)
+            if paged and button.loads_on_demand(data):
+                # rows are kept as is, so all items would be loaded
+                raise ValueError(
+                    f"ScrollingGroup `{self.widget_id}` requires `width` "
+                    f"to load items of `{button.widget_id}` by pages",
+                )
         kbd = await super()._render_keyboard(data, manager)
         pages = len(kbd) // self.height + bool(len(kbd) % self.height)
-        last_page = pages - 1
         if pages <= 1:
             return kbd
-        current_page = min(last_page, self.get_page(manager))
+        current_page = min(pages - 1, self.get_page(manager))
+        return kbd[current_page * self.height: (current_page + 1) * self.height] + self._render_pager(current_page, pages)
+
+    async def _render_page(self, data: Dict, manager: DialogManager) -> List[List[InlineKeyboardButton]]:
+        """
+        Render only buttons of current page.
+
+        Buttons of `PagedKeyboard` are counted without rendering,
+        other keyboards are rendered entirely as before
+        """
+        if self.concurrent:
+            parts = await asyncio.gather(*(
+                self._count_buttons(b, data, manager) for b in self.buttons
+            ))
+        else:
+            parts = [
+                await self._count_buttons(b, data, manager)
+                for b in self.buttons
+            ]
+        total = sum(count for count, _ in parts)
+        page_size = self.width * self.height
+        pages = total // page_size + bool(total % page_size)
+        current_page = 0
+        if pages > 1:
+            current_page = min(pages - 1, self.get_page(manager))
+        start = current_page * page_size
+        end = start + page_size if pages > 1 else total
+
+        buttons: List[InlineKeyboardButton] = []
+        offset = 0
+        for b, (count, rendered) in zip(self.buttons, parts):
+            first = max(start - offset, 0)
+            last = min(end - offset, count)
+            offset += count
+            if first >= last:
+                continue
+            if rendered is None:
+                buttons.extend(await b.render_buttons(
+                    data, manager, first, last - first,
+                ))
+            else:
+                buttons.extend(rendered[first:last])
+        kbd = self._wrap_kbd(buttons)
+        if pages <= 1:
+            return kbd
+        return kbd + self._render_pager(current_page, pages)
+
+    async def _count_buttons(self, button: Keyboard, data: Dict,
+                             manager: DialogManager):
+        """
+        Returns number of buttons and all of them if they are rendered
+        """
+        if isinstance(button, PagedKeyboard):
+            return await button.get_buttons_count(data, manager), None
+        rendered = list(chain.from_iterable(
+            await button.render_keyboard(data, manager),
+        ))
+        return len(rendered), rendered
+
+    def _render_pager(self, current_page: int, pages: int) -> List[List[InlineKeyboardButton]]:
+        last_page = pages - 1
         next_page = min(last_page, current_page + 1)
         prev_page = max(0, current_page - 1)
-        pager = [[
+        return [[
             InlineKeyboardButton(text="1", callback_data=f"{self.widget_id}:0"),
             InlineKeyboardButton(text="<", callback_data=f"{self.widget_id}:{prev_page}"),
             InlineKeyboardButton(text=str(current_page + 1), callback_data=f"{self.widget_id}:{current_page}"),
             InlineKeyboardButton(text=">", callback_data=f"{self.widget_id}:{next_page}"),
             InlineKeyboardButton(text=str(last_page + 1), callback_data=f"{self.widget_id}:{last_page}"),
         ]]
-        return kbd[current_page * self.height: (current_page + 1) * self.height] + pager
 
     async def process_callback(self, c: CallbackQuery, dialog: Dialog, manager: DialogManager) -> bool:
         prefix = f"{self.widget_id}:"
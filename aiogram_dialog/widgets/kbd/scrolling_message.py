@@ -1,16 +1,19 @@
-import bisect
-import re
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 from aiogram.types import CallbackQuery, InlineKeyboardButton
+from cachetools import LRUCache
 
 from aiogram_dialog import DialogManager, Dialog
 from aiogram_dialog.widgets.kbd import Keyboard
 from aiogram_dialog.widgets.text import Text
+from aiogram_dialog.widgets.text.format import compile_format
 from aiogram_dialog.widgets.when import WhenCondition
 
 
 TELEGRAM_MESSAGE_LENGTH_LIMIT = 4096
+PAGES_CACHE_SIZE = 128
+
+Page = Tuple[int, int]
 
 
 class ScrollingMessage(Keyboard, Text):
@@ -37,9 +40,12 @@ class ScrollingMessage(Keyboard, Text):
         self.show_page_buttons = show_page_buttons
 
         self.text = text_format
+        self.format = compile_format(text_format)
+        # page bounds by text hash, shared by text and keyboard rendering
+        self.pages_cache: LRUCache = LRUCache(maxsize=PAGES_CACHE_SIZE)
 
     async def _render_text(self, data: Dict, manager: DialogManager) -> str:
-        text = self.text.format_map(data)
+        text = self.format(data)
         pages = self.get_pages(text, manager)
         last_page = len(pages) - 1
 
@@ -50,7 +56,7 @@ class ScrollingMessage(Keyboard, Text):
         return text
 
     async def _render_keyboard(self, data: Dict, manager: DialogManager) -> List[List[InlineKeyboardButton]]:
-        text = self.text.format_map(data)
+        text = self.format(data)
         pages = self.get_pages(text, manager)
         last_page = len(pages) - 1
         if last_page <= 0:
@@ -86,41 +92,37 @@ class ScrollingMessage(Keyboard, Text):
         await self.set_page(new_page, manager)
         return True
 
-    def get_pages(self, text, manager: DialogManager):
-        pages = manager.current_context().widget_data.get('pages', None)
-        return pages or self.calc_pages(text)
+    def get_pages(self, text: str, manager: DialogManager) -> List[Page]:
+        key = len(text), hash(text)
+        pages = self.pages_cache.get(key)
+        if pages is None:
+            pages = self.pages_cache[key] = self.calc_pages(text)
+        return pages
 
-    def calc_pages(self, text):
+    def calc_pages(self, text: str) -> List[Page]:
         return list(self.calc_pages_helper(text))
 
-    def calc_pages_helper(self, text):
-        last_pos = 0
-
-        for split_by in self.splitters:
-            splitters = [m.start() for m in re.finditer(split_by, text[last_pos:])] + [len(text)]
-
-            while True:
-                splitter = bisect.bisect_right(splitters, self.limit)
-                if not splitter:
+    def calc_pages_helper(self, text: str):
+        """
+        Split text into pages not longer than limit.
+
+        Page is ended before the last splitter found within the limit,
+        next splitters are used if there is no previous one
+        """
+        start = 0
+        while len(text) - start > self.limit:
+            for splitter in self.splitters:
+                end = text.rfind(
+                    splitter, start + 1, start + self.limit + len(splitter),
+                )
+                if end > start:
                     break
-                else:
-                    max_len = splitters[splitter - 1]
-
-                yield last_pos, max_len + last_pos
-                last_pos = max_len + last_pos
-
-                splitters = (splitter - max_len for splitter in splitters)
-                splitters = list(filter(lambda x: x > 0, splitters))
-
-            if last_pos == len(text):
-                break
-
-            if len(text) - last_pos < self.limit:
-                yield last_pos, len(text)
-                break
+            yield start, end
+            start = end
+        yield start, len(text)
 
     def get_page(self, manager: DialogManager) -> int:
-        return manager.current_context().widget_data.get('page', 0)
+        return manager.current_context().widget_data.get(self.widget_id, 0)
 
     async def set_page(self, page: int, manager: DialogManager):
-        manager.current_context().widget_data['page'] = page
+        manager.current_context().widget_data[self.widget_id] = page
@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
+from collections import Counter
 from operator import itemgetter
-from typing import Callable, Optional, Union, Dict, Any, List, Awaitable, Sequence
+from typing import (
+    Callable, Optional, Union, Dict, Any, List, Awaitable, Sequence,
+    Container, Iterable,
+)
 
 from aiogram.types import CallbackQuery, InlineKeyboardButton
 
@@ -8,37 +12,41 @@ from aiogram_dialog.context.events import ChatEvent
 from aiogram_dialog.dialog import Dialog
 from aiogram_dialog.manager.manager import DialogManager
 from aiogram_dialog.widgets.text import Text, Case
+from aiogram_dialog.widgets.text.base import render_grouped
 from aiogram_dialog.widgets.widget_event import (
     WidgetEventProcessor, ensure_event_processor,
 )
-from .base import Keyboard
+from .base import PagedKeyboard
+from ..data.items_source import (
+    Items, ItemsSource, count_items, get_item, load_items, slice_items,
+)
 from ..managed import ManagedWidgetAdapter
 from ...deprecation_utils import manager_deprecated
 
 ItemIdGetter = Callable[[Any], Union[str, int]]
-ItemsGetter = Callable[[Dict], Sequence]
+ItemsGetter = Callable[[Dict], Items]
 OnItemStateChanged = Callable[
-    [ChatEvent, ManagedWidgetAdapter["Select"], DialogManager, str],
+    [ChatEvent, "ManagedSelectAdapter", DialogManager, str],
     Awaitable,
 ]
 OnItemClick = Callable[
-    [CallbackQuery, ManagedWidgetAdapter["Select"], DialogManager, str],
+    [CallbackQuery, "ManagedSelectAdapter", DialogManager, str],
     Awaitable,
 ]
 
 
-def get_identity(items: Sequence) -> ItemsGetter:
-    def identity(data) -> Sequence:
+def get_identity(items: Items) -> ItemsGetter:
+    def identity(data) -> Items:
         return items
 
     return identity
 
 
-class Select(Keyboard):
+class Select(PagedKeyboard):
     def __init__(self, text: Text,
                  id: str,
                  item_id_getter: ItemIdGetter,
-                 items: Union[str, Sequence],
+                 items: Union[str, Sequence, ItemsSource],
                  on_click: Union[OnItemClick, WidgetEventProcessor, None] = None,
                  when: Union[str, Callable] = None):
         super().__init__(id, when)
@@ -54,17 +62,52 @@ class Select(Keyboard):
 
     async def _render_keyboard(self, data: Dict,
                                manager: DialogManager) -> List[List[InlineKeyboardButton]]:
-        return [[
-            await self._render_button(pos, item, data, manager)
-            for pos, item in enumerate(self.items_getter(data))
-        ]]
-
-    async def _render_button(self, pos: int, item: Any, data: Dict,
-                             manager: DialogManager) -> InlineKeyboardButton:
-        data = {"data": data, "item": item, "pos": pos + 1, "pos0": pos}
-        return InlineKeyboardButton(
-            text=await self.text.render_text(data, manager),
-            callback_data=self.callback_data_prefix + str(self.item_id_getter(item))
+        items = await load_items(self.items_getter(data))
+        return [await self._render_items(data, manager, items, 0)]
+
+    async def _get_buttons_count(self, data: Dict,
+                                 manager: DialogManager) -> int:
+        return await count_items(self.items_getter(data))
+
+    async def _render_buttons(
+            self, data: Dict, manager: DialogManager, offset: int, limit: int,
+    ) -> List[InlineKeyboardButton]:
+        items = await slice_items(self.items_getter(data), offset, limit)
+        return await self._render_items(data, manager, items, offset)
+
+    async def _render_items(
+            self, data: Dict, manager: DialogManager,
+            items: Sequence, offset: int,
+    ) -> List[InlineKeyboardButton]:
+        items_data = [
+            {"data": data, "item": item, "pos": pos + 1, "pos0": pos}
+            for pos, item in enumerate(items, offset)
+        ]
+        item_ids = [str(self.item_id_getter(item)) for item in items]
+        texts = await self._render_texts(items_data, item_ids, manager)
+        prefix = self.callback_data_prefix
+        return [
+            InlineKeyboardButton(text=text, callback_data=prefix + item_id)
+            for text, item_id in zip(texts, item_ids)
+        ]
+
+    async def _render_texts(self, items_data: List[Dict], item_ids: List[str],
+                            manager: DialogManager) -> List[str]:
+        return await self.text.render_texts(items_data, manager)
+
+    def loads_on_demand(self, data: Dict) -> bool:
+        return isinstance(self.items_getter(data), ItemsSource)
+
+    async def get_item(self, item_id: str,
+                       manager: DialogManager) -> Optional[Any]:
+        """
+        Find item by id from callback data, e.g. in `on_click`.
+
+        Items are taken from data of current window, so its getter is called
+        """
+        data = await manager.dialog().load_data()
+        return await get_item(
+            self.items_getter(data), item_id, self.item_id_getter,
         )
 
     async def process_callback(self, c: CallbackQuery, dialog: Dialog,
@@ -75,11 +118,23 @@ class Select(Keyboard):
         await self.on_click.process_event(c, self.managed(manager), manager, item_id)
         return True
 
+    def managed(self, manager: DialogManager):
+        return ManagedSelectAdapter(self, manager)
+
+
+class ManagedSelectAdapter(ManagedWidgetAdapter[Select]):
+    async def get_item(self, item_id: str) -> Optional[Any]:
+        return await self.widget.get_item(item_id, self.manager)
+
+
+def _defined_in(mro: Sequence[type], name: str) -> type:
+    return next(cls for cls in mro if name in vars(cls))
+
 
 class StatefulSelect(Select, ABC):
     def __init__(self, checked_text: Text, unchecked_text: Text,
                  id: str, item_id_getter: ItemIdGetter,
-                 items: Union[str, Sequence],
+                 items: Union[str, Sequence, ItemsSource],
                  on_click: Union[OnItemClick, WidgetEventProcessor, None] = None,
                  on_state_changed: Union[OnItemStateChanged, WidgetEventProcessor, None] = None,
                  when: Union[str, Callable] = None):
@@ -87,6 +142,13 @@ class StatefulSelect(Select, ABC):
         super().__init__(text, id, item_id_getter, items, self._process_click, when)
         self.on_item_click = ensure_event_processor(on_click)
         self.on_state_changed = ensure_event_processor(on_state_changed)
+        # `_get_checked_ids` of a base class ignores overridden
+        # `_is_text_checked`, then items are checked one by one
+        mro = type(self).__mro__
+        self._check_by_ids = (
+            mro.index(_defined_in(mro, "_get_checked_ids")) <=
+            mro.index(_defined_in(mro, "_is_text_checked"))
+        )
 
     async def _process_on_state_changed(self, event: ChatEvent, item_id: str,
                                         manager: DialogManager):
@@ -99,8 +161,32 @@ class StatefulSelect(Select, ABC):
     def _is_text_checked(self, data: Dict, case: Case, manager: DialogManager) -> bool:
         raise NotImplementedError
 
+    def _get_checked_ids(self, items_data: List[Dict], item_ids: List[str],
+                         manager: DialogManager) -> Container[str]:
+        """
+        Get checked ones among rendered item ids
+        """
+        return {
+            item_id
+            for data, item_id in zip(items_data, item_ids)
+            if self._is_text_checked(data, self.text, manager)
+        }
+
+    async def _render_texts(self, items_data: List[Dict], item_ids: List[str],
+                            manager: DialogManager) -> List[str]:
+        if self._check_by_ids:
+            checked = self._get_checked_ids(items_data, item_ids, manager)
+        else:
+            checked = StatefulSelect._get_checked_ids(
+                self, items_data, item_ids, manager,
+            )
+        return await render_grouped(
+            self.text.texts, [item_id in checked for item_id in item_ids],
+            items_data, manager,
+        )
+
     async def _process_click(self, c: CallbackQuery,
-                             select: ManagedWidgetAdapter[Select],
+                             select: ManagedSelectAdapter,
                              manager: DialogManager, item_id: str):
         if self.on_item_click:
             await self.on_item_click.process_event(c, select, manager, item_id)
@@ -108,7 +194,7 @@ class StatefulSelect(Select, ABC):
 
     @abstractmethod
     async def _on_click(self, c: CallbackQuery,
-                        select: ManagedWidgetAdapter[Select],
+                        select: ManagedSelectAdapter,
                         manager: DialogManager, item_id: str):
         raise NotImplementedError
 
@@ -136,6 +222,12 @@ class Radio(StatefulSelect):
             return item_id==self._preview_checked_id(manager, item_id)
         return self.is_checked(item_id, manager)
 
+    def _get_checked_ids(self, items_data: List[Dict], item_ids: List[str],
+                         manager: DialogManager) -> Container[str]:
+        if manager.is_preview() and item_ids:
+            return {self._preview_checked_id(manager, item_ids[0])}
+        return {self.get_checked(manager)}
+
     async def _on_click(self, c: CallbackQuery, select: Select,
                         manager: DialogManager, item_id: str):
         await self.set_checked(c, item_id, manager)
@@ -144,7 +236,7 @@ class Radio(StatefulSelect):
         return ManagedRadioAdapter(self, manager)
 
 
-class ManagedRadioAdapter(ManagedWidgetAdapter[Radio]):
+class ManagedRadioAdapter(ManagedSelectAdapter):
     def get_checked(self,
                     manager: Optional[DialogManager] = None) -> Optional[str]:
         manager_deprecated(manager)
@@ -161,9 +253,80 @@ class ManagedRadioAdapter(ManagedWidgetAdapter[Radio]):
         return self.widget.is_checked(item_id, self.manager)
 
 
+class CheckedIds(list):
+    """
+    List of checked item ids indexed for fast membership check.
+
+    It is copied and pickled as a plain list,
+    so storage format is not changed
+    """
+
+    def __init__(self, ids: Iterable[str] = ()):
+        super().__init__(ids)
+        self._index = Counter(self)
+
+    def __contains__(self, item_id) -> bool:
+        return item_id in self._index
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+    def _reindex(self) -> None:
+        self._index = Counter(self)
+
+    def _discard(self, item_id: str) -> None:
+        count = self._index[item_id] - 1
+        if count > 0:
+            self._index[item_id] = count
+        else:
+            del self._index[item_id]
+
+    def append(self, item_id: str) -> None:
+        super().append(item_id)
+        self._index[item_id] += 1
+
+    def insert(self, index, item_id: str) -> None:
+        super().insert(index, item_id)
+        self._index[item_id] += 1
+
+    def remove(self, item_id: str) -> None:
+        super().remove(item_id)
+        self._discard(item_id)
+
+    def pop(self, index=-1) -> str:
+        item_id = super().pop(index)
+        self._discard(item_id)
+        return item_id
+
+    def extend(self, ids: Iterable[str]) -> None:
+        super().extend(ids)
+        self._reindex()
+
+    def clear(self) -> None:
+        super().clear()
+        self._index.clear()
+
+    def __setitem__(self, index, value) -> None:
+        super().__setitem__(index, value)
+        self._reindex()
+
+    def __delitem__(self, index) -> None:
+        super().__delitem__(index)
+        self._reindex()
+
+    def __iadd__(self, ids: Iterable[str]):
+        self.extend(ids)
+        return self
+
+    def __imul__(self, n: int):
+        super().__imul__(n)
+        self._reindex()
+        return self
+
+
 class Multiselect(StatefulSelect):
     def __init__(self, checked_text: Text, unchecked_text: Text, id: str,
-                 item_id_getter: ItemIdGetter, items: Union[str, Sequence],
+                 item_id_getter: ItemIdGetter, items: Union[str, Sequence, ItemsSource],
                  min_selected: int = 0, max_selected: int = 0,
                  on_click: Union[OnItemClick, WidgetEventProcessor, None] = None,
                  on_state_changed: Union[OnItemStateChanged, WidgetEventProcessor, None] = None,
@@ -179,12 +342,28 @@ class Multiselect(StatefulSelect):
             return ord(item_id[-1])%2 == 1  # just stupid way to make it differ
         return self.is_checked(item_id, manager)
 
+    def _get_checked_ids(self, items_data: List[Dict], item_ids: List[str],
+                         manager: DialogManager) -> Container[str]:
+        if manager.is_preview():
+            return {
+                item_id for item_id in item_ids
+                if item_id and ord(item_id[-1]) % 2 == 1
+            }
+        return self.get_checked(manager)
+
     def is_checked(self, item_id: Union[str, int], manager: DialogManager) -> bool:
         data: List = self.get_checked(manager)
         return str(item_id) in data
 
     def get_checked(self, manager: DialogManager) -> List[str]:
-        return manager.current_context().widget_data.get(self.widget_id, [])
+        widget_data = manager.current_context().widget_data
+        checked = widget_data.get(self.widget_id)
+        if checked is None:
+            return CheckedIds()
+        if not isinstance(checked, CheckedIds):
+            # stored as list, replaced with equal one to index it once
+            checked = widget_data[self.widget_id] = CheckedIds(checked)
+        return checked
 
     async def reset_checked(self, event: ChatEvent, manager: DialogManager):
         manager.current_context().widget_data[self.widget_id] = []
@@ -215,7 +394,7 @@ class Multiselect(StatefulSelect):
         return ManagedMultiSelectAdapter(self, manager)
 
 
-class ManagedMultiSelectAdapter(ManagedWidgetAdapter[Multiselect]):
+class ManagedMultiSelectAdapter(ManagedSelectAdapter):
     def is_checked(self, item_id: Union[str, int],
                    manager: Optional[DialogManager] = None) -> bool:
         manager_deprecated(manager)
@@ -1,7 +1,7 @@
-from typing import Dict
+from typing import Dict, Hashable, List, Mapping, Sequence
 
 from aiogram_dialog.manager.manager import DialogManager
-from aiogram_dialog.widgets.when import Whenable, WhenCondition
+from aiogram_dialog.widgets.when import Whenable, WhenCondition, true
 
 
 class Text(Whenable):
@@ -16,6 +16,25 @@ class Text(Whenable):
     async def _render_text(self, data, manager: DialogManager) -> str:
         raise NotImplementedError
 
+    async def render_texts(self, data_list: Sequence[Dict],
+                           manager: DialogManager) -> List[str]:
+        """
+        Render text for each data at once, used by widgets repeating
+        the same text for many items
+        """
+        if self.condition is true:
+            return await self._render_texts(data_list, manager)
+        shown = [self.is_(data, manager) for data in data_list]
+        rendered = iter(await self._render_texts(
+            [data for data, is_shown in zip(data_list, shown) if is_shown],
+            manager,
+        ))
+        return [next(rendered) if is_shown else "" for is_shown in shown]
+
+    async def _render_texts(self, data_list: Sequence[Dict],
+                            manager: DialogManager) -> List[str]:
+        return [await self._render_text(data, manager) for data in data_list]
+
 
 class Const(Text):
     def __init__(self, text: str, when: WhenCondition = None):
@@ -24,3 +43,29 @@ class Const(Text):
 
     async def _render_text(self, data: Dict, manager: DialogManager) -> str:
         return self.text
+
+    async def _render_texts(self, data_list: Sequence[Dict],
+                            manager: DialogManager) -> List[str]:
+        return [self.text] * len(data_list)
+
+
+async def render_grouped(
+        texts: Mapping[Hashable, Text], selections: Sequence[Hashable],
+        data_list: Sequence[Dict], manager: DialogManager,
+) -> List[str]:
+    """
+    Render each data using text selected for it.
+
+    Data with the same selection is rendered by one `render_texts` call
+    """
+    positions: Dict[Hashable, List[int]] = {}
+    for pos, selection in enumerate(selections):
+        positions.setdefault(selection, []).append(pos)
+    result = [""] * len(data_list)
+    for selection, group in positions.items():
+        rendered = await texts[selection].render_texts(
+            [data_list[pos] for pos in group], manager,
+        )
+        for pos, text in zip(group, rendered):
+            result[pos] = text
+    return result
@@ -1,9 +1,64 @@
-from typing import Dict
+import keyword
+import re
+import string
+from _string import formatter_field_name_split
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence
 
 from .base import Text
 from ..when import WhenCondition
 from ...manager.manager import DialogManager
 
+FormatFunc = Callable[[Dict], str]
+# format specs which can be copied into f-string as is
+SIMPLE_SPEC = re.compile(r"[\w<>=^+\- #,.%]*")
+
+
+@lru_cache(maxsize=1024)
+def compile_format(text: str) -> FormatFunc:
+    """
+    Converts format string into a function working as `text.format_map`.
+
+    Template is parsed once and converted to f-string,
+    so fields are looked up directly on each call.
+    Raises `ValueError` for invalid template or positional fields,
+    which cannot be found in mapping.
+    """
+    keys = []
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(text):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        if field is None:
+            continue
+        first, rest = formatter_field_name_split(field)
+        if not isinstance(first, str) or not first:
+            raise ValueError(f"Positional fields are not supported: {text!r}")
+        expr = f"data[_{len(keys)}]"
+        keys.append(first)
+        for is_attr, key in rest:
+            if not is_attr:
+                expr += f"[_{len(keys)}]"
+                keys.append(key)
+            elif key.isidentifier() and not keyword.iskeyword(key):
+                expr += f".{key}"
+            else:
+                return text.format_map
+        if not SIMPLE_SPEC.fullmatch(spec):  # e.g. nested fields
+            return text.format_map
+        if conversion:
+            expr += f"!{conversion}"
+        if spec:
+            expr += f":{spec}"
+        parts.append(f"{{{expr}}}")
+    # keys are passed as defaults to be local variables of the function.
+    # Expressions contain no quotes, so string can be wrapped with repr
+    args = "".join(f", _{i}=_keys[{i}]" for i in range(len(keys)))
+    source = f"lambda data{args}: f" + repr("".join(parts))
+    try:
+        return eval(source, {"_keys": keys})
+    except SyntaxError:  # e.g. invalid conversion, format_map reports it
+        return text.format_map
+
 
 class _FormatDataStub:
     def __init__(self, name="", data=None):
@@ -32,8 +87,15 @@ class Format(Text):
     def __init__(self, text: str, when: WhenCondition = None):
         super().__init__(when)
         self.text = text
+        self.format = compile_format(text)
 
     async def _render_text(self, data: Dict, manager: DialogManager) -> str:
         if manager.is_preview():
             return self.text.format_map(_FormatDataStub(data=data))
-        return self.text.format_map(data)
+        return self.format(data)
+
+    async def _render_texts(self, data_list: Sequence[Dict],
+                            manager: DialogManager) -> List[str]:
+        if manager.is_preview():
+            return await super()._render_texts(data_list, manager)
+        return list(map(self.format, data_list))
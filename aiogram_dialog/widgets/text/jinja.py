@@ -1,7 +1,11 @@
-from typing import Dict, Any, Iterable, Optional, Callable, Union, Tuple, Mapping
+from typing import (
+    Dict, Any, Iterable, Optional, Callable, Union, Tuple, Mapping,
+    MutableMapping, Sequence, List,
+)
+from weakref import WeakKeyDictionary
 
 from aiogram import Bot
-from jinja2 import Environment, BaseLoader
+from jinja2 import Environment, BaseLoader, Template
 
 from .base import Text
 from ..when import WhenCondition
@@ -17,16 +21,43 @@ class Jinja(Text):
     def __init__(self, text: str, when: WhenCondition = None):
         super().__init__(when)
         self.template_text = text
+        # compiled template for each environment the widget is rendered with
+        self._templates: MutableMapping[Environment, Template] = (
+            WeakKeyDictionary()
+        )
+
+    def get_template(self, env: Environment) -> Template:
+        """
+        Get template compiled for environment, it is compiled only once
+        unless the environment reloads changed templates
+        """
+        template = self._templates.get(env)
+        if template is None or (
+                env.auto_reload and not template.is_up_to_date
+        ):
+            template = env.get_template(self.template_text)
+            self._templates[env] = template
+        return template
 
     async def _render_text(self, data: Dict, manager: DialogManager) -> str:
-        env: Environment = manager.event.bot.get(BOT_ENV_FIELD, default_env)
-        template = env.get_template(self.template_text)
+        env = get_jinja_env(manager.event.bot)
+        template = self.get_template(env)
 
         if env.is_async:
             return await template.render_async(data)
         else:
             return template.render(data)
 
+    async def _render_texts(self, data_list: Sequence[Dict],
+                            manager: DialogManager) -> List[str]:
+        env = get_jinja_env(manager.event.bot)
+        template = self.get_template(env)
+
+        if env.is_async:
+            return [await template.render_async(data) for data in data_list]
+        else:
+            return list(map(template.render, data_list))
+
 
 class StubLoader(BaseLoader):
     def get_source(self, environment, template):
@@ -58,4 +89,8 @@ def setup_jinja(
     return bot[BOT_ENV_FIELD]
 
 
+def get_jinja_env(bot: Bot) -> Environment:
+    return bot.get(BOT_ENV_FIELD, default_env)
+
+
 default_env = _create_env()
@@ -2,22 +2,23 @@ from operator import itemgetter
 from typing import Dict, Union, Sequence, Callable
 
 from .base import Text
+from ..data.items_source import Items, ItemsSource, load_items
 from ..when import WhenCondition
 
 from aiogram_dialog.manager.manager import DialogManager
 
 
-ItemsGetter = Callable[[Dict], Sequence]
+ItemsGetter = Callable[[Dict], Items]
 
 
-def get_identity(items: Sequence) -> ItemsGetter:
-    def identity(data) -> Sequence:
+def get_identity(items: Items) -> ItemsGetter:
+    def identity(data) -> Items:
         return items
     return identity
 
 
 class List(Text):
-    def __init__(self, field: Text, items: Union[str, Callable, Sequence],
+    def __init__(self, field: Text, items: Union[str, Callable, Sequence, ItemsSource],
                  sep: str = "\n", when: WhenCondition = None):
         super().__init__(when)
         self.field = field
@@ -30,8 +31,10 @@ class List(Text):
             self.items_getter = get_identity(items)
 
     async def _render_text(self, data: Dict, manager: DialogManager) -> str:
-        texts = [
-            await self.field.render_text({"data": data, "item": item, "pos": pos + 1, "pos0": pos}, manager)
-            for pos, item in enumerate(self.items_getter(data))
-        ]
+        texts = await self.field.render_texts([
+            {"data": data, "item": item, "pos": pos + 1, "pos0": pos}
+            for pos, item in enumerate(
+                await load_items(self.items_getter(data)),
+            )
+        ], manager)
         return self.sep.join(filter(None, texts))
@@ -1,23 +1,50 @@
-from typing import Callable, Union, Dict, Any, Hashable
+import asyncio
+from typing import Callable, Union, Dict, Any, Hashable, List, Sequence
 
-from .base import Text
+from .base import Text, render_grouped
 from ..when import WhenCondition
 from ...manager.manager import DialogManager
 
 
 class Multi(Text):
-    def __init__(self, *texts: Text, sep="\n", when: WhenCondition = None):
+    def __init__(self, *texts: Text, sep="\n", when: WhenCondition = None,
+                 concurrent: bool = False):
         super().__init__(when)
         self.texts = texts
         self.sep = sep
+        # rendering in separate tasks is slower unless texts wait for I/O
+        self.concurrent = concurrent
 
     async def _render_text(self, data, manager: DialogManager) -> str:
-        texts = [
-            await t.render_text(data, manager)
-            for t in self.texts
-        ]
+        if self.concurrent:
+            texts = await asyncio.gather(*(
+                t.render_text(data, manager) for t in self.texts
+            ))
+        else:
+            texts = [
+                await t.render_text(data, manager)
+                for t in self.texts
+            ]
         return self.sep.join(filter(None, texts))
 
+    async def _render_texts(self, data_list: Sequence[Dict],
+                            manager: DialogManager) -> List[str]:
+        if not self.texts:
+            return [""] * len(data_list)
+        if self.concurrent:
+            columns = await asyncio.gather(*(
+                t.render_texts(data_list, manager) for t in self.texts
+            ))
+        else:
+            columns = [
+                await t.render_texts(data_list, manager)
+                for t in self.texts
+            ]
+        return [
+            self.sep.join(filter(None, texts))
+            for texts in zip(*columns)
+        ]
+
 
 Selector = Callable[[Dict, "Case", DialogManager], Hashable]
 
@@ -41,3 +68,12 @@ class Case(Text):
     async def _render_text(self, data, manager: DialogManager) -> str:
         selection = self.selector(data, self, manager)
         return await self.texts[selection].render_text(data, manager)
+
+    async def _render_texts(self, data_list: Sequence[Dict],
+                            manager: DialogManager) -> List[str]:
+        selections = [
+            self.selector(data, self, manager) for data in data_list
+        ]
+        return await render_grouped(
+            self.texts, selections, data_list, manager,
+        )
@@ -1,4 +1,6 @@
-from typing import Union, Sequence, Tuple, Callable, Dict, List
+from typing import (
+    Any, Union, Sequence, Tuple, Callable, Dict, List, Iterator,
+)
 
 from aiogram.types import ForceReply as ForceReplyMarkup
 
@@ -7,6 +9,8 @@ from .input import MessageHandlerFunc, BaseInput, MessageInput
 from .kbd import Keyboard, Group
 from .media import Media
 from .text import Multi, Format, Text
+from .action import Actionable
+from .when import Whenable
 from .widget_event import WidgetEventProcessor
 from ..exceptions import InvalidWidgetType, InvalidWidget
 
@@ -119,3 +123,23 @@ def ensure_data_getter(getter: GetterVariant) -> DataGetter:
             f"Cannot add data getter of type {type(getter)}. "
             f"Only Dict, Callable or List of Callables are supported"
         )
+
+
+def iter_widgets(*roots: Any) -> Iterator[Union[Whenable, Actionable]]:
+    """
+    Find all widgets nested into windows or other widgets
+    """
+    seen = set()
+    found = [vars(root) for root in roots]
+    while found:
+        obj = found.pop()
+        if isinstance(obj, dict):
+            found.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            found.extend(obj)
+        elif isinstance(obj, (Whenable, Actionable)):
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            yield obj
+            found.append(vars(obj))
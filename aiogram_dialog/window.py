@@ -1,6 +1,12 @@
+import asyncio
+import hashlib
+import pickle
+from copy import deepcopy
 from logging import getLogger
 from typing import Dict, Optional, List, Union
 
+from cachetools import LRUCache
+
 from aiogram.dispatcher.filters.state import State
 from aiogram.types import (
     InlineKeyboardMarkup, Message, CallbackQuery, ParseMode, ForceReply as ForceReplyMarkup
@@ -30,6 +36,7 @@ class Window(DialogWindowProto):
                  preview_data: GetterVariant = None,
                  remove_on_close: Optional[bool] = None,
                  input_removing: Optional[bool] = None,
+                 render_cache_size: int = 0,
                  ):
         (
             self.text, self.keyboard, self.on_message, self.media,
@@ -46,6 +53,11 @@ class Window(DialogWindowProto):
         self._remove_on_close = remove_on_close
         self._input_removing = input_removing
         self._message_id = None
+        # rendered messages by getter data and context,
+        # so widgets must not depend on anything else to use it
+        self.render_cache: Optional[LRUCache] = None
+        if render_cache_size:
+            self.render_cache = LRUCache(maxsize=render_cache_size)
 
     async def render_text(self, data: Dict, manager: DialogManager) -> str:
         return await self.text.render_text(data, manager)
@@ -89,10 +101,35 @@ class Window(DialogWindowProto):
         if self.keyboard:
             await self.keyboard.process_callback(c, dialog, manager)
 
+    def _render_key(self, data: Dict, manager: DialogManager) -> Optional[str]:
+        if self.render_cache is None or manager.is_preview():
+            return None
+        context = manager.current_context()
+        try:
+            dump = pickle.dumps((
+                context.id, context.state.state, context.start_data,
+                context.dialog_data, context.widget_data, data,
+            ), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None  # cannot be cached
+        return hashlib.blake2b(dump, digest_size=16).hexdigest()
+
     async def render(self, dialog: Dialog, manager: DialogManager) -> NewMessage:
         logger.debug("Show window: %s", self)
         current_data = await self.load_data(dialog, manager)
-        reply_markup = await self.render_kbd(current_data, manager)
+        render_key = self._render_key(current_data, manager)
+        if render_key and render_key in self.render_cache:
+            reply_markup, text, media = deepcopy(self.render_cache[render_key])
+        else:
+            reply_markup, text, media = await asyncio.gather(
+                self.render_kbd(current_data, manager),
+                self.render_text(current_data, manager),
+                self.render_media(current_data, manager),
+            )
+            if render_key:
+                self.render_cache[render_key] = deepcopy(
+                    (reply_markup, text, media),
+                )
 
         message_is_last = True
         if isinstance(manager.event, Message):
@@ -110,12 +147,13 @@ class Window(DialogWindowProto):
 
         return NewMessage(
             chat=get_chat(manager.event),
-            text=await self.render_text(current_data, manager),
+            text=text,
             reply_markup=reply_markup,
             parse_mode=self.parse_mode,
             show_mode=ShowMode.SEND if force_new else ShowMode.EDIT,
             disable_web_page_preview=self.disable_web_page_preview,
-            media=await self.render_media(current_data, manager),
+            media=media,
+            render_key=render_key,
         )
 
     def get_state(self) -> State:
@@ -0,0 +1,101 @@
+"""
+Compares `Multiselect` state kept as indexed `CheckedIds`
+with plain list of checked ids used before.
+
+Run: python benchmarks/multiselect.py
+"""
+import asyncio
+import time
+from typing import Dict, List
+
+from aiogram_dialog.widgets.kbd import Multiselect
+from aiogram_dialog.widgets.text import Format
+
+ITEMS_COUNT = 1000
+CHECKED_COUNT = 500
+REPEATS = 5
+
+
+class ListMultiselect(Multiselect):
+    def get_checked(self, manager) -> List[str]:
+        return manager.current_context().widget_data.get(self.widget_id, [])
+
+    def _get_checked_ids(self, items_data, item_ids, manager):
+        return self.get_checked(manager)
+
+
+class Context:
+    def __init__(self):
+        self.widget_data = {}
+
+
+class Manager:
+    def __init__(self, checked: List[str]):
+        self.context = Context()
+        self.context.widget_data["m"] = list(checked)
+
+    def is_preview(self):
+        return False
+
+    def current_context(self):
+        return self.context
+
+
+async def best_time(action, checked: List[str]) -> float:
+    results = []
+    for _ in range(REPEATS):
+        manager = Manager(checked)  # state is loaded as list on each update
+        started = time.perf_counter()
+        await action(manager)
+        results.append(time.perf_counter() - started)
+    return min(results)
+
+
+async def measure(multiselect: Multiselect, data: Dict, checked: List[str]):
+    items_data = [
+        {"data": data, "item": item, "pos": pos + 1, "pos0": pos}
+        for pos, item in enumerate(data["items"])
+    ]
+    item_ids = [item[0] for item in data["items"]]
+
+    async def render(manager):
+        await multiselect._render_texts(items_data, item_ids, manager)
+
+    async def check_all(manager):
+        for item_id in item_ids:
+            multiselect.is_checked(item_id, manager)
+
+    async def toggle_all(manager):
+        for item_id in item_ids:
+            await multiselect.set_checked(
+                None, item_id, not multiselect.is_checked(item_id, manager),
+                manager,
+            )
+
+    return [
+        await best_time(render, checked),
+        await best_time(check_all, checked),
+        await best_time(toggle_all, checked),
+    ]
+
+
+async def main():
+    data = {"items": [(str(i), f"Item {i}") for i in range(ITEMS_COUNT)]}
+    checked = [str(i) for i in range(ITEMS_COUNT - 1, 0, -2)][:CHECKED_COUNT]
+    widgets = [
+        cls(
+            Format("✓ {item[1]}"), Format("{item[1]}"),
+            id="m", item_id_getter=lambda x: x[0], items="items",
+        )
+        for cls in (ListMultiselect, Multiselect)
+    ]
+    old, new = [await measure(w, data, checked) for w in widgets]
+    print(f"{ITEMS_COUNT} items, {CHECKED_COUNT} checked, time in ms")
+    for name, old_time, new_time in zip(
+            ["render", "is_checked x1000", "set_checked x1000"], old, new,
+    ):
+        print(f"{name:20} {old_time * 1e3:8.2f} -> {new_time * 1e3:7.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+"""
+Compares rendering of wide `Select` keyboards using compiled `Format`
+with plain `str.format_map` used before.
+
+Run: python benchmarks/select_format.py
+"""
+import asyncio
+import time
+from typing import Dict
+
+from aiogram_dialog.widgets.kbd import Select
+from aiogram_dialog.widgets.text import Format
+
+ITEMS_COUNT = 100
+ROUNDS = 200
+REPEATS = 5
+TEMPLATES = [
+    "{item[1]}",
+    "{pos}. {item[1]} ({item[0]})",
+    "{item[1]:>10} — {data[currency]} {item[2]:.2f}",
+]
+
+
+class FormatMap(Format):
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.format = text.format_map
+
+
+class Manager:
+    def is_preview(self):
+        return False
+
+
+async def best_time(render) -> float:
+    await render()
+    results = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            await render()
+        results.append((time.perf_counter() - started) / ROUNDS)
+    return min(results)
+
+
+async def measure(text: Format, data: Dict):
+    select = Select(text, id="s", item_id_getter=lambda x: x[0], items="items")
+    manager = Manager()
+    items_data = [
+        {"data": data, "item": item, "pos": pos + 1, "pos0": pos}
+        for pos, item in enumerate(data["items"])
+    ]
+
+    async def render_texts():
+        for item_data in items_data:
+            await text.render_text(item_data, manager)
+
+    async def render_keyboard():
+        await select.render_keyboard(data, manager)
+
+    return await best_time(render_texts), await best_time(render_keyboard)
+
+
+async def main():
+    data = {
+        "items": [(str(i), f"Item {i}", i * 1.5) for i in range(ITEMS_COUNT)],
+        "currency": "USD",
+    }
+    print(f"Select with {ITEMS_COUNT} buttons, time per render in us")
+    print(f"{'template':50} {'texts':>16} {'keyboard':>18}")
+    for template in TEMPLATES:
+        old_texts, old_kbd = await measure(FormatMap(template), data)
+        new_texts, new_kbd = await measure(Format(template), data)
+        print(
+            f"{template!r:50} "
+            f"{old_texts * 1e6:7.1f} -> {new_texts * 1e6:6.1f} "
+            f"{old_kbd * 1e6:8.1f} -> {new_kbd * 1e6:7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Compares rendering texts of `Select` family widgets item by item,
+as it was done before, with batch rendering used now.
+
+Run: python benchmarks/select_render.py
+"""
+import asyncio
+import time
+from typing import Dict, List
+
+from aiogram_dialog.widgets.kbd import Multiselect, Radio, Select
+from aiogram_dialog.widgets.text import Format, Multi, Const
+
+ITEMS_COUNT = 500
+CHECKED_COUNT = 250
+ROUNDS = 50
+REPEATS = 5
+
+
+class Context:
+    def __init__(self, widget_data: Dict):
+        self.widget_data = widget_data
+
+
+class Manager:
+    def __init__(self, widget_data: Dict):
+        self.context = Context(widget_data)
+
+    def is_preview(self):
+        return False
+
+    def current_context(self):
+        return self.context
+
+
+async def best_time(render) -> float:
+    await render()
+    results = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        for _ in range(ROUNDS):
+            await render()
+        results.append((time.perf_counter() - started) / ROUNDS)
+    return min(results)
+
+
+async def measure(select: Select, data: Dict, manager: Manager):
+    items = data["items"]
+    items_data = [
+        {"data": data, "item": item, "pos": pos + 1, "pos0": pos}
+        for pos, item in enumerate(items)
+    ]
+    item_ids = [str(item[0]) for item in items]
+
+    async def render_by_item() -> List[str]:
+        return [
+            await select.text.render_text(item_data, manager)
+            for item_data in items_data
+        ]
+
+    async def render_batch() -> List[str]:
+        return await select._render_texts(items_data, item_ids, manager)
+
+    assert await render_by_item() == await render_batch()
+    return await best_time(render_by_item), await best_time(render_batch)
+
+
+async def main():
+    data = {"items": [(str(i), f"Item {i}") for i in range(ITEMS_COUNT)]}
+    checked = [str(i) for i in range(0, ITEMS_COUNT, 2)][:CHECKED_COUNT]
+    manager = Manager({"m": checked, "r": checked[-1]})
+    checked_text = Format("✓ {item[1]}")
+    unchecked_text = Format("{item[1]}")
+    widgets = {
+        "Select": Select(
+            Multi(Const("#"), Format("{pos}. {item[1]}"), sep=""),
+            id="s", item_id_getter=lambda x: x[0], items="items",
+        ),
+        "Radio": Radio(
+            checked_text, unchecked_text,
+            id="r", item_id_getter=lambda x: x[0], items="items",
+        ),
+        "Multiselect": Multiselect(
+            checked_text, unchecked_text,
+            id="m", item_id_getter=lambda x: x[0], items="items",
+        ),
+    }
+    print(
+        f"{ITEMS_COUNT} items, {CHECKED_COUNT} checked, "
+        f"time per render in us",
+    )
+    for name, select in widgets.items():
+        by_item, batch = await measure(select, data, manager)
+        print(f"{name:15} {by_item * 1e6:9.1f} -> {batch * 1e6:8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -33,7 +33,10 @@ setup(
     extras_require={
         "tools": [
             "diagrams"
-        ]
+        ],
+        "msgpack": [
+            "msgpack"
+        ],
     },
     package_data={
         'aiogram_dialog.tools': ['calculator.png'],
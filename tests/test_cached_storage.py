@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from aiogram_dialog.context.cached_storage import CachedDialogStorage
+from aiogram_dialog.context.dialog_storage import (
+    MemoryDialogStorage, context_key, stack_key,
+)
+from aiogram_dialog.exceptions import VersionConflictError
+
+CONTEXT = context_key("intent")
+STACK = stack_key("")
+WRITE_DELAY = 0.01
+
+
+def record(version, **data):
+    return {"_version": version, **data}
+
+
+async def save_delayed_changes():
+    storage = MemoryDialogStorage()
+    cached = CachedDialogStorage(storage, write_delay=WRITE_DELAY)
+    # new records are saved without expected versions
+    await cached.save(1, 1, [
+        (CONTEXT, record(1, value=0)),
+        (STACK, record(1, intents=["intent"])),
+    ], versions={})
+    # next updates expect versions of records which are not written yet
+    for version in range(1, 4):
+        await cached.save(
+            1, 1, [(CONTEXT, record(version + 1, value=version))],
+            versions={CONTEXT: version},
+        )
+        await asyncio.sleep(WRITE_DELAY * 3)
+    return await storage.load(1, 1, [CONTEXT, STACK])
+
+
+def test_delayed_writes_with_versions():
+    context, stack = asyncio.run(save_delayed_changes())
+    assert context == record(4, value=3)
+    assert stack == record(1, intents=["intent"])
+
+
+async def save_after_concurrent_change():
+    storage = MemoryDialogStorage()
+    cached = CachedDialogStorage(storage, write_delay=WRITE_DELAY)
+    await storage.save(1, 1, [(CONTEXT, record(1, value=0))])
+    context, = await cached.load(1, 1, [CONTEXT])
+    # another process changes the record
+    await storage.save(1, 1, [(CONTEXT, record(2, value=1))])
+    await cached.save(
+        1, 1, [(CONTEXT, record(2, value=2))], versions={CONTEXT: 1},
+    )
+    await cached.flush()
+
+
+def test_delayed_write_conflict():
+    with pytest.raises(VersionConflictError):
+        asyncio.run(save_after_concurrent_change())
+
+
+class FailingStorage(MemoryDialogStorage):
+    def __init__(self, failing_user: int):
+        super().__init__()
+        self.failing_user = failing_user
+        self.closed = False
+
+    async def save(self, chat_id, user_id, records, versions=None):
+        if user_id == self.failing_user:
+            raise ConnectionError("Storage is unavailable")
+        await super().save(chat_id, user_id, records, versions)
+
+    async def close(self):
+        self.closed = True
+
+
+async def close_with_failing_user():
+    storage = FailingStorage(failing_user=1)
+    cached = CachedDialogStorage(storage, write_delay=60)
+    for user_id in (1, 2):
+        await cached.save(1, user_id, [(STACK, record(1))])
+    with pytest.raises(ConnectionError):
+        await cached.close()
+    return storage
+
+
+def test_close_writes_other_users():
+    storage = asyncio.run(close_with_failing_user())
+    assert asyncio.run(storage.load(1, 2, [STACK])) == [record(1)]
+    assert storage.closed
+
+
+async def load_after_purge():
+    storage = MemoryDialogStorage(ttl=WRITE_DELAY)
+    cached = CachedDialogStorage(storage)
+    await cached.save(1, 1, [(STACK, record(1))])
+    await asyncio.sleep(WRITE_DELAY * 2)
+    purged = []
+    await cached.purge_expired(10, lambda *args: purged.append(args))
+    assert purged == [((1, 1), [STACK])]
+    return await cached.load(1, 1, [STACK])
+
+
+def test_purged_records_are_not_cached():
+    assert asyncio.run(load_after_purge()) == [None]
@@ -0,0 +1,60 @@
+import asyncio
+
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+
+from aiogram_dialog.context.dialog_storage import (
+    FSMDialogStorage, MemoryDialogStorage, context_key, stack_key,
+)
+
+TTL = 0.05
+
+
+def stack(stack_id, *intents):
+    return stack_key(stack_id), {"_id": stack_id, "intents": list(intents)}
+
+
+def context(intent_id, stack_id):
+    return context_key(intent_id), {"_stack_id": stack_id}
+
+
+async def expire_abandoned_stack(storage):
+    await storage.save(1, 1, [
+        stack("", "main"), context("main", ""),
+        stack("new", "extra"), context("extra", "new"),
+    ])
+    # only the default stack is used by the user
+    for _ in range(3):
+        await asyncio.sleep(TTL / 2)
+        await storage.load(1, 1, [context_key("main")])
+    purged = await storage.purge_expired(10)
+    records = await storage.load(1, 1, [
+        stack_key(""), context_key("main"),
+        stack_key("new"), context_key("extra"),
+    ])
+    return purged, [record is not None for record in records]
+
+
+def test_memory_storage_expires_stacks():
+    storage = MemoryDialogStorage(ttl=TTL)
+    purged, present = asyncio.run(expire_abandoned_stack(storage))
+    assert purged == 2
+    assert present == [True, True, False, False]
+
+
+def test_fsm_storage_expires_stacks():
+    storage = FSMDialogStorage(MemoryStorage(), ttl=TTL)
+    purged, present = asyncio.run(expire_abandoned_stack(storage))
+    assert purged == 2
+    assert present == [True, True, False, False]
+
+
+async def expire_on_access():
+    storage = MemoryDialogStorage(ttl=TTL)
+    await storage.save(1, 1, [stack("", "main"), context("main", "")])
+    await asyncio.sleep(TTL * 2)
+    loaded = await storage.load_stack_and_context(1, 1, "")
+    return loaded, storage.users
+
+
+def test_expired_stack_is_not_loaded():
+    assert asyncio.run(expire_on_access()) == ((None, None), {})
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from itertools import count
+
+from aiogram import Bot, Dispatcher
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.dispatcher.filters.state import State, StatesGroup
+from aiogram.types import Update
+
+from aiogram_dialog import Dialog, DialogManager, DialogRegistry, Window
+from aiogram_dialog.context.coalescer import EditCoalescer
+from aiogram_dialog.widgets.text import Format
+
+WINDOW = 0.05
+message_ids = count(1)
+
+
+class FakeBot(Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+
+    async def request(self, method, data=None, files=None, **kwargs):
+        self.calls.append(method)
+        if method == "deleteMessage":
+            # postponed edit is due while the message is being deleted
+            await asyncio.sleep(WINDOW * 2)
+        if method in ("sendMessage", "editMessageText"):
+            return {
+                "message_id": data.get("message_id") or next(message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(data["chat_id"]), "type": "private"},
+                "text": data.get("text"),
+            }
+        return True
+
+
+class SG(StatesGroup):
+    main = State()
+
+
+async def get_progress(dialog_manager: DialogManager, **kwargs):
+    data = dialog_manager.current_context().dialog_data
+    return {"progress": data.get("progress", 0)}
+
+
+def message_update(text: str) -> Update:
+    return Update(**{"update_id": next(message_ids), "message": {
+        "message_id": next(message_ids), "date": int(time.time()),
+        "text": text,
+        "chat": {"id": 1, "type": "private"},
+        "from": {"id": 1, "is_bot": False, "first_name": "user"},
+    }})
+
+
+async def resend_with_postponed_edit():
+    bot = FakeBot(token="123:abc")
+    Bot.set_current(bot)
+    dp = Dispatcher(bot, storage=MemoryStorage())
+    coalescer = EditCoalescer(window=WINDOW)
+    registry = DialogRegistry(dp, edit_coalescer=coalescer)
+    managers = []
+
+    @dp.message_handler(text="start", state="*")
+    async def start(message, dialog_manager: DialogManager):
+        await dialog_manager.start(SG.main)
+        managers.append(dialog_manager.bg())
+
+    registry.register(Dialog(Window(
+        Format("{progress}"), state=SG.main, getter=get_progress,
+        remove_on_close=True,
+    )))
+    await dp.process_update(message_update("start"))
+    bg = managers[0]
+    for progress in (1, 2):
+        await bg.update({"progress": progress})
+        await asyncio.sleep(WINDOW / 5)
+    postponed = bool(coalescer.pending)
+    # dialog is sent again below the message of user, old one is removed
+    await dp.process_update(message_update("hi"))
+    await asyncio.sleep(WINDOW * 2)
+    return postponed, coalescer.pending, bot.calls
+
+
+def test_removed_message_is_not_edited():
+    postponed, pending, calls = asyncio.run(resend_with_postponed_edit())
+    assert postponed
+    assert not pending
+    removed_at = calls.index("deleteMessage")
+    assert "editMessageText" not in calls[removed_at:]
@@ -0,0 +1,13 @@
+from aiogram_dialog.context import getter_cache
+from aiogram_dialog.widgets.data import CachedGetter
+
+
+async def get_data(**kwargs):
+    return {}
+
+
+def test_cache_is_used_after_cached_getter_created(monkeypatch):
+    monkeypatch.setattr(getter_cache, "_cached_getters_created", False)
+    assert not getter_cache.has_cached_getters()
+    CachedGetter(get_data)
+    assert getter_cache.has_cached_getters()
@@ -0,0 +1,36 @@
+import asyncio
+
+from aiogram_dialog.widgets.data import AsyncIteratorSource, SequenceSource
+
+ITEMS = [(str(i), f"item{i}") for i in range(10)]
+
+
+def item_id(item):
+    return item[0]
+
+
+def test_sequence_source_get():
+    source = SequenceSource(ITEMS, item_id)
+    assert asyncio.run(source.get("3")) == ("3", "item3")
+    assert asyncio.run(source.get("missing")) is None
+
+
+async def get_from_iterator():
+    read = []
+
+    async def items():
+        for item in ITEMS:
+            read.append(item)
+            yield item
+
+    source = AsyncIteratorSource(items(), item_id)
+    found = await source.get("3")
+    page = await source.slice(2, 2)
+    return found, page, len(read)
+
+
+def test_async_iterator_source_reads_till_item():
+    found, page, read = asyncio.run(get_from_iterator())
+    assert found == ("3", "item3")
+    assert page == ITEMS[2:4]
+    assert read == 4
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from itertools import count
+
+from aiogram import Bot, Dispatcher
+from aiogram.contrib.fsm_storage.memory import MemoryStorage
+from aiogram.dispatcher.filters.state import State, StatesGroup
+from aiogram.types import Update
+
+from aiogram_dialog import Dialog, DialogManager, DialogRegistry, Window
+from aiogram_dialog.context.task_pool import TaskPool
+from aiogram_dialog.exceptions import LockReentryError
+from aiogram_dialog.widgets.text import Const
+
+message_ids = count(1)
+
+
+class FakeBot(Bot):
+    async def request(self, method, data=None, files=None, **kwargs):
+        return {
+            "message_id": next(message_ids),
+            "date": int(time.time()),
+            "chat": {"id": int(data["chat_id"]), "type": "private"},
+            "text": data.get("text"),
+        }
+
+
+class SG(StatesGroup):
+    main = State()
+
+
+def message_update(user_id: int, text: str) -> Update:
+    return Update(**{"update_id": next(message_ids), "message": {
+        "message_id": next(message_ids), "date": int(time.time()),
+        "text": text,
+        "chat": {"id": user_id, "type": "private"},
+        "from": {"id": user_id, "is_bot": False, "first_name": "user"},
+    }})
+
+
+def build(**registry_kwargs):
+    bot = FakeBot(token="123:abc")
+    Bot.set_current(bot)
+    dp = Dispatcher(bot, storage=MemoryStorage())
+    registry = DialogRegistry(dp, **registry_kwargs)
+    return dp, registry
+
+
+def register_dialog(registry: DialogRegistry):
+    # after test handlers, so the dialog does not process their messages
+    registry.register(Dialog(Window(Const("main"), state=SG.main)))
+
+
+async def broadcast_to_itself():
+    dp, registry = build()
+    results = []
+
+    @dp.message_handler(text="start", state="*")
+    async def start(message, dialog_manager: DialogManager):
+        await dialog_manager.start(SG.main)
+
+    @dp.message_handler(text="broadcast", state="*")
+    async def broadcast(message, dialog_manager: DialogManager):
+        async for result in registry.broadcast_update([1, 2], {}):
+            results.append(result)
+
+    register_dialog(registry)
+    for user_id in (1, 2):
+        await dp.process_update(message_update(user_id, "start"))
+    await asyncio.wait_for(
+        dp.process_update(message_update(1, "broadcast")), 5,
+    )
+    return {result.user_id: result.error for result in results}
+
+
+def test_broadcast_to_own_user_fails_fast():
+    errors = asyncio.run(broadcast_to_itself())
+    assert isinstance(errors[1], LockReentryError)
+    assert errors[2] is None
+
+
+async def notify_from_handler():
+    dp, registry = build(task_pool=TaskPool(max_concurrency=1, max_queue=1))
+
+    @dp.message_handler(text="start", state="*")
+    async def start(message, dialog_manager: DialogManager):
+        await dialog_manager.start(SG.main)
+        # the first one waits for the lock, the second one fills the queue
+        for _ in range(3):
+            await dialog_manager.bg().update({})
+
+    register_dialog(registry)
+    await asyncio.wait_for(
+        dp.process_update(message_update(1, "start")), 5,
+    )
+    await registry.close(timeout=5)
+    return registry.task_pool.stats
+
+
+def test_notify_from_handler_does_not_wait_for_queue():
+    stats = asyncio.run(notify_from_handler())
+    assert stats.completed == 3
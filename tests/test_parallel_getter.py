@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from aiogram_dialog.widgets.data import GetterSpec, ParallelGetter
+
+
+async def get_user(**kwargs):
+    raise ConnectionError("Database is unavailable")
+
+
+async def get_orders(user, **kwargs):
+    return {"orders": [user]}
+
+
+def test_fallback_covers_failed_dependency():
+    getter = ParallelGetter(
+        GetterSpec(get_user, name="user", fallback={"user": None}),
+        GetterSpec(get_orders, depends_on=["user"], fallback={"orders": []}),
+    )
+    assert asyncio.run(getter()) == {"user": None, "orders": [None]}
+
+
+def test_dependency_without_fallback_fails():
+    getter = ParallelGetter(
+        GetterSpec(get_user, name="user"),
+        GetterSpec(get_orders, depends_on=["user"], fallback={"orders": []}),
+    )
+    # dependency without fallback still fails the whole getter
+    with pytest.raises(ConnectionError):
+        asyncio.run(getter())
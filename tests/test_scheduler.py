@@ -0,0 +1,53 @@
+import asyncio
+import io
+
+import pytest
+from aiogram.types import InputFile
+from aiogram.utils.exceptions import RetryAfter
+
+from aiogram_dialog.context.scheduler import (
+    Priority, RequestScheduler, ScheduledBot,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, delay: float) -> None:
+        self.now += delay
+
+
+class FloodBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_photo(self, chat_id, photo):
+        self.sent.append(photo)
+        raise RetryAfter(30)
+
+
+async def send_after_long_pause():
+    clock = FakeClock()
+    scheduler = RequestScheduler(clock=clock)
+    bot = ScheduledBot(FloodBot(), scheduler, Priority.INTERACTIVE)
+    photo = InputFile(io.BytesIO(b"photo"), filename="photo.png")
+    with pytest.raises(RetryAfter):
+        await bot.send_photo(1, photo)
+    sent_uploads = len(bot.bot.sent)
+    clock.now += 10  # idle buckets are dropped after 3 seconds
+
+    async def request():
+        return clock.now
+
+    sent_at = await scheduler.call(1, Priority.INTERACTIVE, request)
+    return sent_uploads, sent_at
+
+
+def test_pause_is_kept_and_uploads_are_not_retried():
+    sent_uploads, sent_at = asyncio.run(send_after_long_pause())
+    assert sent_uploads == 1
+    assert sent_at >= 30